@@ -0,0 +1,30 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("audios", "0003_alter_audio_original"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="audio",
+            name="duration",
+            field=models.DurationField(
+                blank=True, help_text="The duration of the audio.", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="audio",
+            name="peaks",
+            field=models.FileField(
+                blank=True,
+                help_text="The min and max waveform peaks of the audio as pairs of signed bytes.",
+                max_length=255,
+                upload_to="",
+            ),
+        ),
+    ]
@@ -10,19 +10,34 @@ from utils.models import UUIDTaggedItem
 def get_audio_upload_path(instance, filename):
     """Return the upload path for this audio file."""
     return Path(
-        f"audios/user_{instance.gallery.owner.id}/gallery_{instance.gallery.uuid}/audio_{instance.uuid}{Path(filename).suffix.lower()}",
+        f"audios/user_{instance.gallery.owner_id}/gallery_{instance.gallery.uuid}/audio_{instance.uuid}{Path(filename).suffix.lower()}",
     )
 
 
 class Audio(GalleryFile):
     """The Audio model."""
 
+    ingest_tasks = ["audios.generate_waveform"]
+    media_fields = ["original", "peaks"]
+
     original = models.FileField(
         upload_to=get_audio_upload_path,
         max_length=255,
         help_text="The original uploaded file.",
     )
 
+    duration = models.DurationField(
+        null=True,
+        blank=True,
+        help_text="The duration of the audio.",
+    )
+
+    peaks = models.FileField(
+        max_length=255,
+        blank=True,
+        help_text="The min and max waveform peaks of the audio as pairs of signed bytes.",
+    )
+
     tags = TaggableManager(
         through=UUIDTaggedItem,
         help_text="The tags for this audio file",
@@ -0,0 +1,9 @@
+from . import waveform
+from .models import Audio
+from jobs.registry import register
+
+
+@register("audios.generate_waveform")
+def generate_waveform(uuid):
+    """Compute and save the waveform peaks of an audio file."""
+    waveform.generate_waveform(Audio.objects.get(uuid=uuid))
@@ -0,0 +1,91 @@
+import json
+import math
+import subprocess
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+# the audio is decoded to mono 16 bit samples at this rate, which is plenty for peaks
+SAMPLE_RATE = 8000
+
+
+def get_duration(path):
+    """Return the duration of the audio file in seconds."""
+    output = subprocess.run(
+        [
+            settings.FFPROBE_BINARY,
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-print_format",
+            "json",
+            path,
+        ],
+        check=True,
+        capture_output=True,
+    ).stdout
+    return float(json.loads(output)["format"]["duration"])
+
+
+def compute_peaks(path, duration, count):
+    """Return the min and max sample of each of count buckets of the audio as int8 pairs.
+
+    ffmpeg decodes the audio to raw samples which are read in chunks of whole
+    buckets, so even multi-hour recordings never need to fit in memory.
+    """
+    bucket = max(1, math.ceil(duration * SAMPLE_RATE / count))
+    process = subprocess.Popen(
+        [
+            settings.FFMPEG_BINARY,
+            "-v",
+            "error",
+            "-i",
+            path,
+            "-ac",
+            "1",
+            "-ar",
+            str(SAMPLE_RATE),
+            "-f",
+            "s16le",
+            "-",
+        ],
+        stdout=subprocess.PIPE,
+    )
+    peaks = []
+    chunk_size = bucket * 2 * 256
+    with process.stdout:
+        while data := process.stdout.read(chunk_size):
+            samples = np.frombuffer(data[: len(data) // 2 * 2], dtype="<i2")
+            # pad the last chunk to whole buckets with silence
+            samples = np.pad(samples, (0, -len(samples) % bucket))
+            buckets = samples.reshape(-1, bucket)
+            peaks.append(np.stack([buckets.min(axis=1), buckets.max(axis=1)], axis=1))
+    if process.wait():
+        raise subprocess.CalledProcessError(process.returncode, process.args)
+    if not peaks:
+        return np.zeros((0, 2), dtype=np.int8)
+    # scale the 16 bit samples down to 8 bits, which is plenty for drawing
+    return (np.concatenate(peaks) >> 8).astype(np.int8)
+
+
+def generate_waveform(audio):
+    """Compute the waveform peaks of the audio and save them in a file next to the original.
+
+    The peaks file is AUDIO_WAVEFORM_PEAKS pairs of signed bytes, the min and the max
+    of each slice of the audio, so a browser can draw the waveform from a couple of KB.
+    """
+    source = audio.original.path
+    duration = get_duration(source)
+    peaks = compute_peaks(source, duration, settings.AUDIO_WAVEFORM_PEAKS)
+    name = str(Path(audio.original.name).with_suffix(".peaks"))
+    storage = audio.original.storage
+    if storage.exists(name):
+        storage.delete(name)
+    audio.peaks = storage.save(name, ContentFile(peaks.tobytes()))
+    audio.duration = timedelta(seconds=duration)
+    audio.filesize = audio.original.size
+    audio.save(update_fields=["peaks", "duration", "filesize", "updated"])
@@ -1,3 +1,7 @@
 from ninja import NinjaAPI
 
-api = NinjaAPI()
+from galleries.api import router as uploads_router
+
+# session authentication requires csrf protection
+api = NinjaAPI(csrf=True)
+api.add_router("/uploads/", uploads_router)
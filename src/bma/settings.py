@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     "bornhack_allauth_provider",
     "users",
     "utils",
+    "jobs",
     "galleries",
     "pictures",
     "videos",
@@ -132,6 +133,16 @@ STATIC_URL = "static/"  # serve the static files here
 
 MEDIA_URL = "media/"
 
+# stream uploads to disk while detecting mimetype and checksum, see utils.upload
+FILE_UPLOAD_HANDLERS = ["utils.upload.HashingTemporaryFileUploadHandler"]
+
+# the largest file which can be uploaded with the chunked upload API, in bytes
+FILE_UPLOAD_MAX_SIZE = 10 * 1024**3
+
+# chunked uploads which received no chunks for this many seconds are deleted by
+# the expire_uploads command
+UPLOAD_SESSION_TIMEOUT = 2 * 24 * 3600
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -152,6 +163,72 @@ SOCIALACCOUNT_ADAPTER = (
 )
 TAGGIT_CASE_INSENSITIVE = True
 IMAGEKIT_USE_MEMCACHED_SAFE_CACHE_KEY = False
+# look up the existence of picture renditions in the database instead of storage
+IMAGEKIT_DEFAULT_CACHEFILE_BACKEND = "pictures.cachefiles.RenditionCacheFileBackend"
 GALLERY_MANAGER_DEFAULT_PAGINATE_COUNT = 20
 
+# picture renditions are also generated in these formats, in order of preference,
+# if Pillow supports them. AVIF needs pillow-avif-plugin.
+PICTURE_RENDITION_VARIANT_FORMATS = ["AVIF", "WEBP"]
+PICTURE_RENDITION_OPTIONS = {
+    "AVIF": {"quality": 60},
+    "WEBP": {"quality": 80},
+}
+
+# a running job is claimed by its worker for this many seconds, and the lease is
+# renewed while the job runs. Jobs of workers which were killed are run again when
+# their lease expires.
+JOB_LEASE_TIMEOUT = 300
+
+# the ffmpeg tools used to process videos and audio
+FFMPEG_BINARY = "ffmpeg"
+FFPROBE_BINARY = "ffprobe"
+
+# videos are transcoded to these HLS renditions, largest first. Renditions larger
+# than the original video are skipped.
+VIDEO_HLS_RENDITIONS = [
+    {"height": 1080, "video_bitrate": "5000k", "audio_bitrate": "192k"},
+    {"height": 720, "video_bitrate": "2800k", "audio_bitrate": "128k"},
+    {"height": 480, "video_bitrate": "1400k", "audio_bitrate": "128k"},
+    {"height": 360, "video_bitrate": "800k", "audio_bitrate": "96k"},
+]
+
+# only Safari plays HLS without a script, so videos are also transcoded to a single
+# progressive MP4 of at most this size, which other browsers play instead.
+VIDEO_MP4_RENDITION = {"height": 720, "video_bitrate": "2800k", "audio_bitrate": "128k"}
+
+# a thumbnail is taken every VIDEO_SPRITE_INTERVAL seconds for scrubbing previews,
+# and tiled into sprite sheets of VIDEO_SPRITE_COLUMNS x VIDEO_SPRITE_ROWS.
+VIDEO_SPRITE_INTERVAL = 10
+VIDEO_SPRITE_TILE_WIDTH = 160
+VIDEO_SPRITE_COLUMNS = 10
+VIDEO_SPRITE_ROWS = 10
+
+# the number of min/max pairs in the waveform peaks of audio files
+AUDIO_WAVEFORM_PEAKS = 1000
+
+# the poppler tools used to make previews of documents
+PDFINFO_BINARY = "pdfinfo"
+PDFTOPPM_BINARY = "pdftoppm"
+PDFTOTEXT_BINARY = "pdftotext"
+
+# public pages are cached for anonymous visitors for this many seconds, and
+# invalidated when the galleries or files on them change. This needs a cache shared
+# by all processes, like the file or Redis backends, see CACHES in the environment
+# settings. Pages are not cached with the per-process local memory backend.
+PUBLIC_PAGE_CACHE_TIMEOUT = 3600
+
+# the permissions to media files are cached for this many seconds
+MEDIA_PERMISSION_CACHE_TIMEOUT = 60
+
+# signed media URLs of published files are valid for between one and two times this
+# many seconds, see utils/signing.py. This must be longer than the cache timeouts of
+# pages with media URLs, like PUBLIC_PAGE_CACHE_TIMEOUT.
+MEDIA_URL_LIFETIME = 86400
+
+# published renditions may be cached for this many seconds, and are then checked
+# with a conditional request. They are not immutable, since they are generated
+# again under the same path, for example when the spec of a rendition changes.
+RENDITION_CACHE_MAX_AGE = 3600
+
 X_FRAME_OPTIONS = "SAMEORIGIN"
@@ -16,6 +16,7 @@ urlpatterns = [
     path("api/", api.urls),
     path("", TemplateView.as_view(template_name="frontpage.html"), name="frontpage"),
     path("galleries/", include("galleries.urls", namespace="galleries")),
+    path("pictures/", include("pictures.urls", namespace="pictures")),
 ]
 
 if settings.NGINX_PROXY:
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0003_alter_document_original"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="pages",
+            field=models.PositiveIntegerField(
+                blank=True, help_text="The number of pages in the document.", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="text",
+            field=models.TextField(
+                blank=True,
+                help_text="The plain text extracted from the document, for search.",
+            ),
+        ),
+    ]
@@ -4,25 +4,40 @@ from django.db import models
 from taggit.managers import TaggableManager
 
 from galleries.models import GalleryFile
+from pictures.models import RenditionsMixin
 from utils.models import UUIDTaggedItem
 
 
 def get_document_upload_path(instance, filename):
     """Return the upload path for this document file."""
     return Path(
-        f"documents/user_{instance.gallery.owner.id}/gallery_{instance.gallery.uuid}/document_{instance.uuid}{Path(filename).suffix.lower()}",
+        f"documents/user_{instance.gallery.owner_id}/gallery_{instance.gallery.uuid}/document_{instance.uuid}{Path(filename).suffix.lower()}",
     )
 
 
-class Document(GalleryFile):
+class Document(RenditionsMixin, GalleryFile):
     """The Document model."""
 
+    ingest_tasks = ["documents.generate_preview"]
+    prefetch_lookups = ["tags", "renditions"]
+
     original = models.FileField(
         upload_to=get_document_upload_path,
         max_length=255,
         help_text="The original uploaded file.",
     )
 
+    pages = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="The number of pages in the document.",
+    )
+
+    text = models.TextField(
+        blank=True,
+        help_text="The plain text extracted from the document, for search.",
+    )
+
     tags = TaggableManager(
         through=UUIDTaggedItem,
         help_text="The tags for this document file",
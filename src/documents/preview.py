@@ -0,0 +1,121 @@
+import re
+import subprocess
+import tempfile
+from pathlib import Path
+
+import magic
+from django.conf import settings
+from pilkit.processors import ProcessorPipeline
+from PIL import Image
+
+from pictures.models import Picture
+from pictures.renditions import RENDITIONS
+from pictures.renditions import save_rendition
+from pictures.renditions import save_rendition_rows
+from utils.upload import MAGIC_HEADER_SIZE
+
+
+def get_page_count(path):
+    """Return the number of pages in the PDF."""
+    output = subprocess.run(
+        [settings.PDFINFO_BINARY, path],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    match = re.search(r"^Pages:\s+(\d+)$", output, re.MULTILINE)
+    return int(match.group(1)) if match else None
+
+
+def extract_text(path):
+    """Return the plain text of the PDF."""
+    return subprocess.run(
+        [settings.PDFTOTEXT_BINARY, "-enc", "UTF-8", path, "-"],
+        check=True,
+        capture_output=True,
+        text=True,
+        errors="replace",
+    ).stdout
+
+
+def render_first_page(path, size):
+    """Return the first page of the PDF rendered to fit inside a box of size pixels."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        prefix = Path(tmpdir) / "page"
+        subprocess.run(
+            [
+                settings.PDFTOPPM_BINARY,
+                "-f",
+                "1",
+                "-l",
+                "1",
+                "-singlefile",
+                "-png",
+                # scale the longest side of the page to the longest side of the box
+                "-scale-to",
+                str(max(size)),
+                path,
+                str(prefix),
+            ],
+            check=True,
+            capture_output=True,
+        )
+        with Image.open(prefix.with_suffix(".png")) as image:
+            image.load()
+    image.thumbnail(size)
+    return image.convert("RGB")
+
+
+def get_rendition_path(document, name):
+    """Return the storage path of a rendition of the first page of the document."""
+    stem = Path(document.original.name).with_suffix("")
+    return f"{settings.IMAGEKIT_CACHEFILE_DIR}/{stem}/{name}.jpg"
+
+
+def generate_preview(document):
+    """Render the first page of the document to the renditions Picture uses.
+
+    The page is rendered once by poppler at the size of the largest rendition, and
+    the smaller renditions are resized from it like picture renditions are. The
+    page count and the plain text of the document are saved for search.
+
+    Plain text documents have no pages for poppler to render, so only their text is
+    saved.
+    """
+    # detected like the upload was, the suffix of the filename can not be trusted
+    with document.original.open("rb") as f:
+        header = f.read(MAGIC_HEADER_SIZE)
+        if magic.from_buffer(header, mime=True) == "text/plain":
+            document.text = (header + f.read()).decode("utf-8", errors="replace")
+            document.filesize = document.original.size
+            document.save(update_fields=["text", "filesize", "updated"])
+            return
+
+    specs = [getattr(Picture, name).get_spec(source=None) for name in RENDITIONS]
+    boxes = [(p.width, p.height) for spec in specs for p in spec.processors]
+    page = render_first_page(
+        document.original.path, max(boxes, key=lambda box: box[0] * box[1])
+    )
+
+    source = page
+    renditions = []
+    for name, spec in zip(RENDITIONS, specs):
+        rendition = ProcessorPipeline(spec.processors).process(source)
+        renditions += save_rendition(
+            document,
+            name,
+            rendition,
+            get_rendition_path(document, name),
+            spec.format,
+            spec.autoconvert,
+            **(spec.options or {}),
+        )
+        # resize the next rendition from this one, unless it was scaled up
+        if rendition.width <= page.width and rendition.height <= page.height:
+            source = rendition
+    save_rendition_rows(renditions)
+
+    document.pages = get_page_count(document.original.path)
+    document.text = extract_text(document.original.path)
+    document.filesize = document.original.size
+    document.save(update_fields=["pages", "text", "filesize", "updated"])
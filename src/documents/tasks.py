@@ -0,0 +1,9 @@
+from .models import Document
+from .preview import generate_preview
+from jobs.registry import register
+
+
+@register("documents.generate_preview")
+def generate_document_preview(uuid):
+    """Render the first page renditions of a document and extract its text."""
+    generate_preview(Document.objects.get(uuid=uuid))
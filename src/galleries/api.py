@@ -0,0 +1,177 @@
+import hashlib
+import os
+import re
+from uuid import UUID
+
+import magic
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from ninja import Field
+from ninja import Router
+from ninja import Schema
+from ninja.errors import HttpError
+from ninja.security import django_auth
+
+from .ingest import enqueue_ingest_jobs
+from .ingest import get_galleryfile_model
+from .models import Gallery
+from .models import UploadSession
+from utils.upload import MAGIC_HEADER_SIZE
+
+router = Router(auth=django_auth, tags=["uploads"])
+
+content_range_re = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+# read the request body and the uploaded file in blocks of this size
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class UploadSessionIn(Schema):
+    gallery: UUID
+    # the lengths of the fields of UploadSession
+    filename: str = Field(min_length=1, max_length=255)
+    mimetype: str = Field(max_length=255)
+    # the file is allocated on disk when the session is created
+    size: int = Field(gt=0, le=settings.FILE_UPLOAD_MAX_SIZE)
+
+
+class UploadSessionOut(Schema):
+    uuid: UUID
+    gallery_id: UUID
+    filename: str
+    filetype: str
+    size: int
+    offset: int
+    received: list[list[int]]
+    status: str
+
+
+class UploadFinalizedOut(Schema):
+    uuid: UUID
+    filetype: str
+    filesize: int
+    checksum: str
+
+
+def get_upload_session(request, upload_uuid, **kwargs):
+    """Return the UploadSession if it is owned by the user or the user is an admin."""
+    upload = get_object_or_404(UploadSession, uuid=upload_uuid, **kwargs)
+    if upload.gallery.owner != request.user and not request.user.is_superuser:
+        raise HttpError(403, "You do not have access to this upload")
+    return upload
+
+
+@router.post("/", response={201: UploadSessionOut})
+def upload_create(request, payload: UploadSessionIn):
+    """Create an upload session and allocate the final storage location of the file."""
+    gallery = get_object_or_404(Gallery, uuid=payload.gallery)
+    if gallery.owner != request.user and not request.user.is_superuser:
+        raise HttpError(403, "You do not have access to this gallery")
+    model = get_galleryfile_model(payload.mimetype)
+    if model is None:
+        raise HttpError(400, f"File type {payload.mimetype} not supported")
+    upload = UploadSession(
+        gallery=gallery,
+        filename=payload.filename,
+        filetype=model._meta.model_name,
+        mimetype=payload.mimetype,
+        size=payload.size,
+    )
+    # the path is found the same way the FileField would when saving the file
+    instance = model(uuid=upload.file_uuid, gallery=gallery)
+    upload.path = model._meta.get_field("original").generate_filename(
+        instance, payload.filename
+    )
+    path = default_storage.path(upload.path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.truncate(payload.size)
+    upload.save()
+    return 201, upload
+
+
+@router.get("/{upload_uuid}/", response=UploadSessionOut)
+def upload_status(request, upload_uuid: UUID):
+    """Return the upload session including the received offset and byte ranges."""
+    return get_upload_session(request, upload_uuid)
+
+
+@router.put("/{upload_uuid}/", response=UploadSessionOut)
+def upload_chunk(request, upload_uuid: UUID):
+    """Write the byte range given in the Content-Range header directly to the file.
+
+    Chunks can be uploaded in any order and in parallel, and a failed chunk can be
+    retried on its own.
+    """
+    upload = get_upload_session(request, upload_uuid, status="UPLOADING")
+    match = content_range_re.match(request.headers.get("Content-Range", ""))
+    if not match:
+        raise HttpError(400, "Content-Range header must be 'bytes start-end/size'")
+    start, end, size = (int(x) for x in match.groups())
+    if size != upload.size or start > end or end >= upload.size:
+        raise HttpError(416, "Content-Range does not fit the file")
+    length = end - start + 1
+    try:
+        content_length = int(request.headers.get("Content-Length", -1))
+    except ValueError:
+        raise HttpError(400, "Content-Length must be an integer")
+    if content_length != length:
+        raise HttpError(400, "Content-Length does not match Content-Range")
+
+    # stream the body to the right offset of the file without buffering it
+    with open(default_storage.path(upload.path), "r+b") as f:
+        f.seek(start)
+        remaining = length
+        while remaining:
+            data = request.read(min(COPY_BUFFER_SIZE, remaining))
+            if not data:
+                raise HttpError(400, "Request body ended before the end of the range")
+            f.write(data)
+            remaining -= len(data)
+
+    with transaction.atomic():
+        upload = UploadSession.objects.select_for_update().get(uuid=upload.uuid)
+        upload.add_range(start, end + 1)
+        upload.save(update_fields=["received", "updated"])
+    return upload
+
+
+@router.post("/{upload_uuid}/finalize/", response={201: UploadFinalizedOut})
+def upload_finalize(request, upload_uuid: UUID):
+    """Verify the uploaded file and create the GalleryFile in the gallery."""
+    upload = get_upload_session(request, upload_uuid, status="UPLOADING")
+    if not upload.is_complete:
+        raise HttpError(409, f"Upload incomplete, received {upload.offset} bytes")
+    path = default_storage.path(upload.path)
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        mimetype = magic.from_buffer(f.read(MAGIC_HEADER_SIZE), mime=True)
+        f.seek(0)
+        while data := f.read(COPY_BUFFER_SIZE):
+            hasher.update(data)
+    model = get_galleryfile_model(mimetype)
+    if model is None or model._meta.model_name != upload.filetype:
+        raise HttpError(400, f"File type {mimetype} does not match {upload.mimetype}")
+
+    with transaction.atomic():
+        # lock the session, so concurrent finalize calls create the file only once
+        upload = UploadSession.objects.select_for_update().get(uuid=upload.uuid)
+        if upload.status != "UPLOADING":
+            raise HttpError(409, "Upload is already finalized")
+        galleryfile = model(
+            uuid=upload.file_uuid,
+            gallery=upload.gallery,
+            original_filename=upload.filename,
+            title=upload.filename,
+            filesize=upload.size,
+            checksum=hasher.hexdigest(),
+        )
+        # the file is already in place, so only the name is saved
+        galleryfile.original = upload.path
+        galleryfile.save()
+        enqueue_ingest_jobs([galleryfile])
+        upload.status = "FINALIZED"
+        upload.save(update_fields=["status", "updated"])
+    return 201, galleryfile
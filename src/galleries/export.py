@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.contrib.staticfiles import finders
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count
+from django.db.models import Max
+from django.db.models import prefetch_related_objects
+from django.db.models.functions import Coalesce
+from django.db.models.functions import Greatest
+from django.template.loader import render_to_string
+
+from .models import Gallery
+from .models import StatusChoices
+
+# the static files used by the exported pages
+STATIC_FILES = ["css/vendor/bootstrap.5.0.2.min.css", "css/bma.css"]
+
+# media fields which reference other files by relative path, like the segments of
+# a HLS playlist, so they cannot be renamed and are not exported
+UNEXPORTED_MEDIA_FIELDS = ["playlist", "thumbnails"]
+
+STATE_FILE = "export.json"
+
+
+def write_file(path, content):
+    """Write the content to the path atomically, so a mirror never sees half a file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    with os.fdopen(fd, "w" if isinstance(content, str) else "wb") as f:
+        f.write(content)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+class StaticExport:
+    """Export the published galleries and files to a tree of static HTML and JSON files.
+
+    The tree looks like the public website, so it can be served by plain nginx or a
+    CDN in place of Django:
+
+        galleries/index.html and index.json        the list of galleries
+        galleries/<slug>/index.html and gallery.json  a gallery and its files
+        media/<hash>.<ext>                         the originals and renditions
+        static/                                    the stylesheets
+
+    Media files are named by the SHA256 of their content, so they never change and
+    can be cached forever. The state of the last export is kept in export.json in the
+    tree, and only galleries which changed since then are exported again.
+    """
+
+    def __init__(self, root, stdout=None):
+        self.root = Path(root)
+        self.stdout = stdout
+        try:
+            self.state = json.loads((self.root / STATE_FILE).read_text())
+        except FileNotFoundError:
+            self.state = {"galleries": {}, "files": {}}
+        # the hashed media files of the galleries exported in this run
+        self.files = {}
+
+    def log(self, message):
+        if self.stdout:
+            self.stdout.write(message)
+
+    def get_queryset(self):
+        """Return the published galleries with a version which changes when the gallery or its files do.
+
+        A file which is added, changed, tagged or has its renditions generated bumps
+        the latest updated time, and a deleted file changes the file count.
+        """
+        return (
+            Gallery.objects.filter(status=StatusChoices.PUBLISHED)
+            .annotate(
+                files_updated=Coalesce(Max("galleryfiles__updated"), "updated"),
+                files_count=Count("galleryfiles"),
+            )
+            .annotate(changed=Greatest("updated", "files_updated"))
+            .select_related("cover")
+            .prefetch_related("cover__renditions")
+            .order_by("created", "uuid")
+        )
+
+    def get_media_path(self, name):
+        """Copy the file from storage to its hashed path in the tree and return the path.
+
+        The hash of each file is remembered with its size and modification time, so
+        unchanged files are not read again in later exports.
+        """
+        try:
+            stat = [
+                default_storage.size(name),
+                default_storage.get_modified_time(name).isoformat(),
+            ]
+        except FileNotFoundError:
+            self.log(f"Skipping missing file {name}")
+            return None
+        cached = self.state["files"].get(name)
+        if cached and cached[:2] == stat and (self.root / cached[2]).exists():
+            self.files[name] = cached
+            return cached[2]
+
+        sha256 = hashlib.sha256()
+        with default_storage.open(name) as f:
+            for chunk in f.chunks():
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+        path = f"media/{digest[:2]}/{digest[2:32]}{Path(name).suffix.lower()}"
+        target = self.root / path
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+            with os.fdopen(fd, "wb") as dst, default_storage.open(name) as src:
+                shutil.copyfileobj(src, dst)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, target)
+        self.files[name] = [*stat, path]
+        return path
+
+    def get_file_data(self, galleryfile):
+        """Return a dict describing the file with the paths of its exported media."""
+        data = {
+            "uuid": galleryfile.uuid,
+            "type": galleryfile.filetype,
+            "title": galleryfile.title,
+            "description": galleryfile.description,
+            "source": galleryfile.source,
+            "created": galleryfile.created,
+            "updated": galleryfile.updated,
+            "tags": [tag.name for tag in galleryfile.tags.all()],
+            "filesize": galleryfile.filesize,
+            "checksum": galleryfile.checksum,
+            "media": {
+                field: self.get_media_path(getattr(galleryfile, field).name)
+                for field in galleryfile.media_fields
+                if field not in UNEXPORTED_MEDIA_FIELDS and getattr(galleryfile, field)
+            },
+        }
+        if hasattr(galleryfile, "renditions_by_format"):
+            data["renditions"] = {
+                fmt: {
+                    name: {
+                        "path": self.get_media_path(rendition.path),
+                        "width": rendition.width,
+                        "height": rendition.height,
+                    }
+                    for name, rendition in renditions.items()
+                }
+                for fmt, renditions in galleryfile.renditions_by_format.items()
+            }
+        for field in ["original_width", "original_height", "taken", "duration"]:
+            if hasattr(galleryfile, field):
+                data[field] = getattr(galleryfile, field)
+        return data
+
+    def get_gallery_data(self, gallery):
+        """Return a dict describing the gallery, without its files."""
+        data = {
+            "uuid": gallery.uuid,
+            "name": gallery.name,
+            "slug": gallery.slug,
+            "description": gallery.description,
+            "license": gallery.license,
+            "license_name": gallery.get_license_display(),
+            "attribution": gallery.attribution,
+            "created": gallery.created,
+            "updated": gallery.changed,
+            "file_counts": gallery.published_file_totals,
+            "cover": None,
+        }
+        if gallery.cover:
+            thumbnail = gallery.cover.renditions_by_name.get("small_thumbnail")
+            if thumbnail:
+                data["cover"] = {
+                    "path": self.get_media_path(thumbnail.path),
+                    "width": thumbnail.width,
+                    "height": thumbnail.height,
+                }
+        return data
+
+    def export_gallery(self, gallery, directory):
+        """Write the HTML and JSON of the gallery and copy its media files."""
+        galleryfiles = list(
+            gallery.galleryfiles.filter(status=StatusChoices.PUBLISHED).order_by(
+                "created", "uuid"
+            )
+        )
+        for galleryfile in galleryfiles:
+            galleryfile.gallery = gallery
+        for model in {type(galleryfile) for galleryfile in galleryfiles}:
+            prefetch_related_objects(
+                [f for f in galleryfiles if type(f) is model],
+                *model.prefetch_lookups,
+            )
+        data = self.get_gallery_data(gallery)
+        data["files"] = [self.get_file_data(f) for f in galleryfiles]
+        write_file(
+            self.root / directory / "gallery.json",
+            json.dumps(data, cls=DjangoJSONEncoder, indent=2),
+        )
+        write_file(
+            self.root / directory / "index.html",
+            render_to_string(
+                "export/gallery_detail.html",
+                {"gallery": data, "root": "../../"},
+            ),
+        )
+
+    def export_static(self):
+        """Copy the static files used by the exported pages."""
+        for name in STATIC_FILES:
+            target = self.root / "static" / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(finders.find(name), target)
+
+    def run(self, full=False):
+        """Export the galleries which changed since the last export, or all of them.
+
+        Return the number of galleries exported and removed.
+        """
+        previous = self.state["galleries"]
+        galleries = {}
+        directories = set()
+        index = []
+        exported = 0
+        for gallery in self.get_queryset():
+            directory = f"galleries/{gallery.slug}"
+            directories.add(directory)
+            version = [gallery.changed.isoformat(), gallery.files_count]
+            old = previous.get(str(gallery.uuid))
+            changed = not old or [old["version"], old["directory"]] != [
+                version,
+                directory,
+            ]
+            if full or changed:
+                self.files = {}
+                self.log(f"Exporting gallery {gallery.uuid} {gallery.name}")
+                self.export_gallery(gallery, directory)
+                exported += 1
+            else:
+                self.files = {
+                    name: self.state["files"][name]
+                    for name in old["media"]
+                    if name in self.state["files"]
+                }
+            gallery_data = self.get_gallery_data(gallery)
+            gallery_data["path"] = f"{directory}/"
+            index.append(gallery_data)
+            galleries[str(gallery.uuid)] = {
+                "version": version,
+                "directory": directory,
+                "media": sorted(self.files),
+            }
+            for name, value in self.files.items():
+                self.state["files"][name] = value
+
+        self.export_static()
+        write_file(
+            self.root / "galleries" / "index.json",
+            json.dumps({"galleries": index}, cls=DjangoJSONEncoder, indent=2),
+        )
+        write_file(
+            self.root / "galleries" / "index.html",
+            render_to_string(
+                "export/gallery_list.html",
+                {"galleries": index, "root": "../"},
+            ),
+        )
+
+        # remove the galleries which are no longer published or were moved
+        for old in previous.values():
+            if old["directory"] not in directories:
+                self.log(f"Removing {old['directory']}")
+                shutil.rmtree(self.root / old["directory"], ignore_errors=True)
+        removed = len(previous.keys() - galleries.keys())
+
+        # remove the media files which are no longer used by any gallery
+        used = {name for gallery in galleries.values() for name in gallery["media"]}
+        self.state = {
+            "galleries": galleries,
+            "files": {
+                name: value
+                for name, value in self.state["files"].items()
+                if name in used
+            },
+        }
+        write_file(self.root / STATE_FILE, json.dumps(self.state, indent=2))
+        paths = {value[2] for value in self.state["files"].values()}
+        for path in (self.root / "media").glob("*/*"):
+            if str(path.relative_to(self.root)) not in paths:
+                path.unlink()
+        return exported, removed
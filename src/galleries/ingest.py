@@ -0,0 +1,112 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db import transaction
+
+from .models import GalleryFile
+from jobs.models import Job
+
+
+def get_galleryfile_model(mimetype):
+    """Return the GalleryFile subclass used for files of this mimetype, or None."""
+    from audios.models import Audio
+    from documents.models import Document
+    from pictures.models import Picture
+    from videos.models import Video
+
+    if mimetype in settings.ALLOWED_PICTURE_TYPES:
+        return Picture
+    elif mimetype in settings.ALLOWED_VIDEO_TYPES:
+        return Video
+    elif mimetype in settings.ALLOWED_AUDIO_TYPES:
+        return Audio
+    elif mimetype in settings.ALLOWED_DOCUMENT_TYPES:
+        return Document
+    return None
+
+
+def bulk_insert(model, objs, fields):
+    """Insert the rows for the given fields of the objects in as few queries as possible.
+
+    QuerySet.bulk_create() refuses to work with multi-table inheritance, so this uses
+    the same Manager._insert() which Model.save() uses, but with many objects at once.
+    """
+    if not objs:
+        return
+    batch_size = connection.ops.bulk_batch_size(fields, objs) or len(objs)
+    for start in range(0, len(objs), batch_size):
+        end = start + batch_size
+        model._base_manager._insert(objs[start:end], fields=fields)
+
+
+def enqueue_ingest_jobs(galleryfiles):
+    """Queue the background jobs for processing newly ingested files."""
+    Job.objects.bulk_create(
+        Job(task=task, kwargs={"uuid": str(galleryfile.uuid)})
+        for galleryfile in galleryfiles
+        for task in galleryfile.ingest_tasks
+    )
+
+
+def ingest_files(gallery, files):
+    """Create GalleryFiles in the gallery for a list of uploaded files.
+
+    The files must have been uploaded with utils.upload.HashingTemporaryFileUploadHandler
+    so the mimetype and checksum are known. Each file is classified and stored once,
+    then the polymorphic GalleryFile rows and the rows of each subclass are inserted
+    in bulk in a single transaction. Thumbnails and other derived files are generated
+    afterwards by the background jobs, see jobs.
+
+    Returns a tuple of a Counter with the number of files created per filetype, and a
+    list of the files which were skipped because the filetype is not supported.
+    """
+    uploads = []
+    skipped = []
+    for f in files:
+        model = get_galleryfile_model(f.detected_mimetype)
+        if model is None:
+            skipped.append(f)
+            continue
+        instance = model(
+            gallery=gallery,
+            original_filename=f.name,
+            title=f.name,
+            filesize=f.size,
+            checksum=f.sha256,
+        )
+        instance.pre_save_polymorphic()
+        uploads.append((instance, f))
+
+    instances = [instance for instance, f in uploads]
+    try:
+        for instance, f in uploads:
+            instance.original.save(f.name, f, save=False)
+        with transaction.atomic():
+            bulk_insert(
+                GalleryFile,
+                instances,
+                GalleryFile._meta.local_concrete_fields,
+            )
+            for model in {type(instance) for instance in instances}:
+                objs = [instance for instance in instances if type(instance) is model]
+                for ptr in model._meta.parents.values():
+                    for obj in objs:
+                        setattr(
+                            obj, ptr.attname, getattr(obj, ptr.target_field.attname)
+                        )
+                bulk_insert(model, objs, model._meta.local_concrete_fields)
+            enqueue_ingest_jobs(instances)
+            # the bulk inserts do not send post_save signals
+            gallery.update_file_counts()
+    except Exception:
+        # do not leave orphaned files in storage
+        for instance in instances:
+            if instance.original:
+                instance.original.delete(save=False)
+        raise
+
+    for instance in instances:
+        instance._state.adding = False
+        instance._state.db = connection.alias
+    return Counter(instance.filetype for instance in instances), skipped
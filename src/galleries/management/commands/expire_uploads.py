@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from galleries.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = "Delete abandoned chunked uploads and their preallocated files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--timeout",
+            type=int,
+            default=settings.UPLOAD_SESSION_TIMEOUT,
+            help="Delete uploads which received no chunks for this many seconds. Defaults to UPLOAD_SESSION_TIMEOUT.",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options["timeout"])
+        expired = UploadSession.objects.filter(status="UPLOADING", updated__lt=cutoff)
+        deleted = 0
+        for upload_uuid in expired.values_list("uuid", flat=True).iterator():
+            with transaction.atomic():
+                # lock the session and check it again, a chunk or finalize may be running
+                upload = (
+                    expired.select_for_update(skip_locked=True)
+                    .filter(uuid=upload_uuid)
+                    .first()
+                )
+                if upload is None:
+                    continue
+                upload.delete()
+                # only delete the file once the row is gone, so no row is left
+                # pointing at a missing file if the delete is rolled back
+                path = upload.path
+                transaction.on_commit(lambda: default_storage.delete(path))
+            deleted += 1
+            self.stdout.write(f"Deleted upload {upload_uuid} {upload.filename}")
+        self.stdout.write(self.style.SUCCESS(f"Done, {deleted} uploads deleted"))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from galleries.export import StaticExport
+
+
+class Command(BaseCommand):
+    help = "Export the published galleries to static HTML and JSON files, which can be served without Django."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "directory",
+            help="The directory to export to. Galleries which did not change since the last export to it are skipped.",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Export all galleries, even if they did not change.",
+        )
+
+    def handle(self, *args, **options):
+        export = StaticExport(options["directory"], stdout=self.stdout)
+        exported, removed = export.run(full=options["full"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done, {exported} galleries exported, {removed} removed",
+            ),
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from galleries.models import Gallery
+
+
+class Command(BaseCommand):
+    help = "Recount the files and pick the cover picture of all galleries."
+
+    def handle(self, *args, **options):
+        repaired = 0
+        for gallery in Gallery.objects.order_by("created").iterator():
+            file_counts, cover_id = gallery.file_counts, gallery.cover_id
+            gallery.update_file_counts()
+            if (gallery.file_counts, gallery.cover_id) != (file_counts, cover_id):
+                repaired += 1
+                self.stdout.write(f"Repaired gallery {gallery.uuid} {gallery.name}")
+        self.stdout.write(self.style.SUCCESS(f"Done, {repaired} galleries repaired"))
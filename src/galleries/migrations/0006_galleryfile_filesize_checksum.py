@@ -0,0 +1,31 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("galleries", "0005_alter_galleryfile_gallery_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="galleryfile",
+            name="checksum",
+            field=models.CharField(
+                blank=True,
+                help_text="The SHA256 checksum of the original file.",
+                max_length=64,
+            ),
+        ),
+        migrations.AddField(
+            model_name="galleryfile",
+            name="filesize",
+            field=models.PositiveBigIntegerField(
+                blank=True,
+                help_text="The size of the original file in bytes.",
+                null=True,
+            ),
+        ),
+    ]
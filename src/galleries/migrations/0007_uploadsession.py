@@ -0,0 +1,104 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("galleries", "0006_galleryfile_filesize_checksum"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UploadSession",
+            fields=[
+                (
+                    "uuid",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "file_uuid",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        help_text="The UUID of the GalleryFile created when this upload is finalized.",
+                    ),
+                ),
+                (
+                    "filename",
+                    models.CharField(
+                        help_text="The original filename of the file being uploaded.",
+                        max_length=255,
+                    ),
+                ),
+                (
+                    "filetype",
+                    models.CharField(
+                        help_text="The model name of the GalleryFile subclass this upload becomes.",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "mimetype",
+                    models.CharField(
+                        help_text="The mimetype of the file as given by the client.",
+                        max_length=255,
+                    ),
+                ),
+                (
+                    "size",
+                    models.PositiveBigIntegerField(
+                        help_text="The total size of the file in bytes."
+                    ),
+                ),
+                (
+                    "path",
+                    models.CharField(
+                        help_text="The storage path the chunks are written to.",
+                        max_length=255,
+                    ),
+                ),
+                (
+                    "received",
+                    models.JSONField(
+                        default=list,
+                        help_text="A sorted list of non-overlapping [start, end) byte ranges received so far.",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("UPLOADING", "Uploading"),
+                            ("FINALIZED", "Finalized"),
+                        ],
+                        default="UPLOADING",
+                        help_text="The status of this upload.",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "gallery",
+                    models.ForeignKey(
+                        help_text="The gallery this upload belongs to.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="upload_sessions",
+                        to="galleries.gallery",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def update_file_counts(apps, schema_editor):
+    """Count the files and pick the cover of the existing galleries."""
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    Gallery = apps.get_model("galleries", "Gallery")
+    GalleryFile = apps.get_model("galleries", "GalleryFile")
+    Picture = apps.get_model("pictures", "Picture")
+    filetypes = dict(ContentType.objects.values_list("id", "model"))
+    for gallery in Gallery.objects.all():
+        counts = {}
+        for row in (
+            GalleryFile.objects.filter(gallery=gallery)
+            .order_by()
+            .values("polymorphic_ctype", "status")
+            .annotate(count=models.Count("uuid"))
+        ):
+            counts.setdefault(filetypes[row["polymorphic_ctype"]], {})[
+                row["status"]
+            ] = row["count"]
+        gallery.file_counts = counts
+        gallery.cover = (
+            Picture.objects.filter(gallery=gallery, status="PUBLISHED")
+            .order_by("created", "uuid")
+            .first()
+        )
+        gallery.save(update_fields=["file_counts", "cover"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("pictures", "0007_picture_exif"),
+        ("galleries", "0007_uploadsession"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="gallery",
+            name="cover",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The picture shown for this gallery in lists. Maintained automatically.",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="pictures.picture",
+            ),
+        ),
+        migrations.AddField(
+            model_name="gallery",
+            name="file_counts",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="The number of files in this gallery by filetype and status, like {'picture': {'PUBLISHED': 3}}. Maintained automatically.",
+            ),
+        ),
+        migrations.RunPython(update_file_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("galleries", "0008_gallery_file_counts_cover"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="gallery",
+            index=models.Index(
+                fields=["status", "created", "uuid"], name="galleries_status_page_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="gallery",
+            index=models.Index(
+                fields=["owner", "created", "uuid"], name="galleries_owner_page_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="galleryfile",
+            index=models.Index(
+                fields=["gallery", "created", "uuid"], name="galleries_file_page_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="galleryfile",
+            index=models.Index(
+                fields=["gallery", "status", "created", "uuid"],
+                name="galleries_file_status_page_idx",
+            ),
+        ),
+    ]
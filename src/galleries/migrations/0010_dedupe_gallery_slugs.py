@@ -0,0 +1,40 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:38
+
+from django.db import migrations
+
+from utils.slugify import unique_slugify
+
+
+def dedupe_slugs(apps, schema_editor):
+    """Give galleries with an empty or duplicate slug a free one, so the slug can be unique.
+
+    The oldest gallery with a slug keeps it, so existing links keep working.
+    """
+    Gallery = apps.get_model("galleries", "Gallery")
+    max_length = Gallery._meta.get_field("slug").max_length
+    slugs_in_use = set(Gallery.objects.values_list("slug", flat=True))
+    seen = set()
+    for gallery in Gallery.objects.order_by("created", "uuid").only("slug", "name"):
+        if gallery.slug and gallery.slug not in seen:
+            seen.add(gallery.slug)
+            continue
+        try:
+            slug = unique_slugify(
+                gallery.slug or gallery.name, slugs_in_use, max_length
+            )
+        except ValueError:
+            slug = unique_slugify(str(gallery.uuid), slugs_in_use, max_length)
+        slugs_in_use.add(slug)
+        seen.add(slug)
+        Gallery.objects.filter(pk=gallery.pk).update(slug=slug)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("galleries", "0009_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_slugs, migrations.RunPython.noop),
+    ]
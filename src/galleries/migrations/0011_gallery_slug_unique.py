@@ -0,0 +1,22 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("galleries", "0010_dedupe_gallery_slugs"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="gallery",
+            name="slug",
+            field=models.SlugField(
+                blank=True,
+                help_text="The URL slug for this gallery. Leave blank to generate based on name.",
+                unique=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("galleries", "0011_gallery_slug_unique"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="galleryfile",
+            index=models.Index(
+                fields=["gallery", "polymorphic_ctype", "status"],
+                name="galleries_file_type_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="galleryfile",
+            index=models.Index(
+                fields=["gallery", "status", "updated"],
+                name="galleries_file_updated_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:52
+
+from django.db import migrations
+import django.db.models.manager
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("galleries", "0012_galleryfile_type_updated_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="galleryfile",
+            options={
+                "base_manager_name": "plain_objects",
+                "default_manager_name": "objects",
+                "ordering": ["created"],
+            },
+        ),
+        migrations.AlterModelManagers(
+            name="galleryfile",
+            managers=[
+                ("plain_objects", django.db.models.manager.Manager()),
+                ("objects", django.db.models.manager.Manager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:54
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models import OuterRef
+from django.db.models import Subquery
+import django.utils.timezone
+
+
+def fill_taken_or_created(apps, schema_editor):
+    """Set the new field to the capture time of pictures, or the upload time."""
+    GalleryFile = apps.get_model("galleries", "GalleryFile")
+    Picture = apps.get_model("pictures", "Picture")
+    GalleryFile.objects.update(taken_or_created=F("created"))
+    GalleryFile.objects.filter(
+        pk__in=Picture.objects.filter(taken__isnull=False).values("pk")
+    ).update(
+        taken_or_created=Subquery(
+            Picture.objects.filter(pk=OuterRef("pk")).values("taken")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("galleries", "0013_galleryfile_base_manager"),
+        ("pictures", "0007_picture_exif"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="galleryfile",
+            name="taken_or_created",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                help_text="The date and time a picture was taken, or when the file was uploaded if that is unknown. Used for ordering by capture time.",
+            ),
+        ),
+        migrations.RunPython(fill_taken_or_created, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="galleryfile",
+            index=models.Index(
+                fields=["gallery", "taken_or_created", "uuid"],
+                name="galleries_file_taken_page_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="galleryfile",
+            index=models.Index(
+                fields=["gallery", "status", "taken_or_created", "uuid"],
+                name="galleries_file_st_taken_idx",
+            ),
+        ),
+    ]
@@ -1,13 +1,20 @@
 import uuid
 
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.storage import default_storage
 from django.db import models
 from django.shortcuts import reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
 from polymorphic.models import PolymorphicModel
 from taggit.managers import TaggableManager
 
 from utils.models import BaseModel
 from utils.models import UUIDTaggedItem
+from utils.signing import get_expires
+from utils.signing import get_signed_media_url
+from utils.slugify import save_with_unique_slug
 
 
 class StatusChoices(models.TextChoices):
@@ -17,9 +24,27 @@ class StatusChoices(models.TextChoices):
     PENDING_DELETION = ("PENDING_DELETION", "Pending Deletion")
 
 
+class UploadStatusChoices(models.TextChoices):
+    UPLOADING = ("UPLOADING", "Uploading")
+    FINALIZED = ("FINALIZED", "Finalized")
+
+
 class Gallery(BaseModel):
     """The Gallery class is used for grouping uploaded files."""
 
+    class Meta:
+        indexes = [
+            # for keyset pagination of the gallery lists
+            models.Index(
+                fields=["status", "created", "uuid"],
+                name="galleries_status_page_idx",
+            ),
+            models.Index(
+                fields=["owner", "created", "uuid"],
+                name="galleries_owner_page_idx",
+            ),
+        ]
+
     owner = models.ForeignKey(
         "users.User",
         on_delete=models.CASCADE,
@@ -39,6 +64,7 @@ class Gallery(BaseModel):
 
     slug = models.SlugField(
         blank=True,
+        unique=True,
         help_text="The URL slug for this gallery. Leave blank to generate based on name.",
     )
 
@@ -62,9 +88,93 @@ class Gallery(BaseModel):
         help_text="The status of this gallery. Only published galleries are visible on the website.",
     )
 
+    file_counts = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="The number of files in this gallery by filetype and status, like {'picture': {'PUBLISHED': 3}}. Maintained automatically.",
+    )
+
+    cover = models.ForeignKey(
+        "pictures.Picture",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        help_text="The picture shown for this gallery in lists. Maintained automatically.",
+    )
+
+    def save(self, *args, **kwargs):
+        """Save the gallery without overwriting the counters with stale values.
+
+        The counters are maintained by update_file_counts(), which may have run
+        since this instance was loaded. New galleries without a slug get a free one
+        based on the name.
+        """
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ("file_counts", "cover")
+            ]
+        if self._state.adding and not self.slug:
+            save_with_unique_slug(
+                self, self.name, lambda: super(Gallery, self).save(*args, **kwargs)
+            )
+        else:
+            super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         return reverse("galleries:gallery_manage_detail", kwargs={"slug": self.slug})
 
+    def update_file_counts(self):
+        """Recount the files in this gallery and pick the cover picture.
+
+        This is called whenever files are added, deleted or change status, so list
+        pages can show the counts and the cover without querying the files.
+        """
+        from pictures.models import Picture
+
+        counts = {}
+        for row in (
+            self.galleryfiles.non_polymorphic()
+            .order_by()
+            .values("polymorphic_ctype", "status")
+            .annotate(count=models.Count("uuid"))
+        ):
+            filetype = ContentType.objects.get_for_id(row["polymorphic_ctype"]).model
+            counts.setdefault(filetype, {})[row["status"]] = row["count"]
+        self.file_counts = counts
+        self.cover = (
+            Picture.objects.filter(gallery=self, status="PUBLISHED")
+            .order_by("created", "uuid")
+            .first()
+        )
+        # only save these fields, so concurrent changes to the gallery are not lost,
+        # and touch updated since pages showing the counts change
+        self.updated = timezone.now()
+        Gallery.objects.filter(pk=self.pk).update(
+            file_counts=self.file_counts,
+            cover=self.cover,
+            updated=self.updated,
+        )
+
+    def count_files(self, status=None):
+        """Return a dict of the number of files by filetype, optionally only with this status."""
+        return {
+            filetype: counts.get(status, 0) if status else sum(counts.values())
+            for filetype, counts in self.file_counts.items()
+        }
+
+    @property
+    def file_totals(self):
+        """Return a dict of the number of files in this gallery by filetype."""
+        return self.count_files()
+
+    @property
+    def published_file_totals(self):
+        """Return a dict of the number of published files in this gallery by filetype."""
+        return self.count_files(status="PUBLISHED")
+
     @property
     def pictures(self):
         from pictures.models import Picture
@@ -93,8 +203,53 @@ class Gallery(BaseModel):
 class GalleryFile(PolymorphicModel):
     """The polymorphic base model inherited by the Picture, Video, Audio, and Document models."""
 
+    # a plain manager for Django internals like cascading deletes, which can not
+    # handle querysets returning a mix of subclasses
+    plain_objects = models.Manager()
+
     class Meta:
         ordering = ["created"]
+        base_manager_name = "plain_objects"
+        default_manager_name = "objects"
+        indexes = [
+            # for keyset pagination of the files in a gallery
+            models.Index(
+                fields=["gallery", "created", "uuid"],
+                name="galleries_file_page_idx",
+            ),
+            models.Index(
+                fields=["gallery", "status", "created", "uuid"],
+                name="galleries_file_status_page_idx",
+            ),
+            # for keyset pagination of the files in a gallery by capture time
+            models.Index(
+                fields=["gallery", "taken_or_created", "uuid"],
+                name="galleries_file_taken_page_idx",
+            ),
+            models.Index(
+                fields=["gallery", "status", "taken_or_created", "uuid"],
+                name="galleries_file_st_taken_idx",
+            ),
+            # for the files of one type in a gallery, and counting them by status
+            models.Index(
+                fields=["gallery", "polymorphic_ctype", "status"],
+                name="galleries_file_type_idx",
+            ),
+            # for the latest change to the published files of a gallery
+            models.Index(
+                fields=["gallery", "status", "updated"],
+                name="galleries_file_updated_idx",
+            ),
+        ]
+
+    # the names of the job tasks run in the background when a file is ingested
+    ingest_tasks = []
+
+    # the relations prefetched for every file when a page of files is shown
+    prefetch_lookups = ["tags"]
+
+    # the file fields with URLs in media_urls
+    media_fields = ["original"]
 
     gallery = models.ForeignKey(
         "galleries.Gallery",
@@ -120,6 +275,11 @@ class GalleryFile(PolymorphicModel):
         help_text="The date and time when this object was last updated.",
     )
 
+    taken_or_created = models.DateTimeField(
+        default=timezone.now,
+        help_text="The date and time a picture was taken, or when the file was uploaded if that is unknown. Used for ordering by capture time.",
+    )
+
     title = models.CharField(
         max_length=255,
         blank=False,
@@ -148,6 +308,135 @@ class GalleryFile(PolymorphicModel):
         help_text="The original (uploaded) filename.",
     )
 
+    filesize = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        help_text="The size of the original file in bytes.",
+    )
+
+    checksum = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="The SHA256 checksum of the original file.",
+    )
+
     @property
     def filetype(self):
         return self._meta.model_name
+
+    @cached_property
+    def is_public(self):
+        """Return True if this file and its gallery are both published."""
+        return (
+            self.status == StatusChoices.PUBLISHED
+            and self.gallery.status == StatusChoices.PUBLISHED
+        )
+
+    def get_media_url(self, name):
+        """Return the URL of a file belonging to this file, like the original or a rendition.
+
+        The URLs of public files are signed, so nginx can serve them without asking
+        Django. Other URLs are checked by Django when they are requested.
+        """
+        if self.is_public:
+            return get_signed_media_url(name)
+        return default_storage.url(name)
+
+    @property
+    def media_url_expires(self):
+        """Return the expiry of the signed media URLs of this file, or None if they are not signed.
+
+        Cached fragments with media URLs include this in their key, so they are
+        rendered again with new URLs before the old ones expire, and when the file
+        or its gallery is published or unpublished.
+        """
+        return get_expires() if self.is_public else None
+
+    @cached_property
+    def media_urls(self):
+        """Return a dict of the URLs of the media_fields of this file which are set."""
+        return {
+            field: self.get_media_url(getattr(self, field).name)
+            for field in self.media_fields
+            if getattr(self, field)
+        }
+
+
+class UploadSession(BaseModel):
+    """A resumable chunked upload of a single file into a gallery.
+
+    Chunks are written directly to the final storage location of the file, and the
+    received byte ranges are tracked so clients can upload in parallel and retry only
+    the ranges which failed. Finalizing the session creates the GalleryFile.
+    """
+
+    gallery = models.ForeignKey(
+        "galleries.Gallery",
+        on_delete=models.CASCADE,
+        related_name="upload_sessions",
+        help_text="The gallery this upload belongs to.",
+    )
+
+    file_uuid = models.UUIDField(
+        default=uuid.uuid4,
+        editable=False,
+        help_text="The UUID of the GalleryFile created when this upload is finalized.",
+    )
+
+    filename = models.CharField(
+        max_length=255,
+        help_text="The original filename of the file being uploaded.",
+    )
+
+    filetype = models.CharField(
+        max_length=20,
+        help_text="The model name of the GalleryFile subclass this upload becomes.",
+    )
+
+    mimetype = models.CharField(
+        max_length=255,
+        help_text="The mimetype of the file as given by the client.",
+    )
+
+    size = models.PositiveBigIntegerField(
+        help_text="The total size of the file in bytes.",
+    )
+
+    path = models.CharField(
+        max_length=255,
+        help_text="The storage path the chunks are written to.",
+    )
+
+    received = models.JSONField(
+        default=list,
+        help_text="A sorted list of non-overlapping [start, end) byte ranges received so far.",
+    )
+
+    status = models.CharField(
+        max_length=20,
+        choices=UploadStatusChoices.choices,
+        default="UPLOADING",
+        help_text="The status of this upload.",
+    )
+
+    def add_range(self, start, end):
+        """Merge the byte range [start, end) into the list of received ranges."""
+        ranges = sorted([*self.received, [start, end]])
+        merged = [ranges[0]]
+        for rstart, rend in ranges[1:]:
+            if rstart <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], rend)
+            else:
+                merged.append([rstart, rend])
+        self.received = merged
+
+    @property
+    def offset(self):
+        """The number of contiguous bytes received from the start of the file."""
+        if self.received and self.received[0][0] == 0:
+            return self.received[0][1]
+        return 0
+
+    @property
+    def is_complete(self):
+        return self.offset == self.size
@@ -0,0 +1,130 @@
+import threading
+import weakref
+
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Gallery
+from .models import GalleryFile
+from utils.cache import bump_generation
+from utils.models import UUIDTaggedItem
+
+
+def invalidate_gallery(*slugs):
+    """Invalidate the cached public pages showing the galleries with these slugs."""
+    bump_generation("galleries", *(f"gallery:{slug}" for slug in slugs))
+
+
+def update_file_counts(gallery_ids):
+    """Recount the files of the galleries which still exist and invalidate their pages."""
+    for gallery in Gallery.objects.filter(pk__in=gallery_ids):
+        gallery.update_file_counts()
+        invalidate_gallery(gallery.slug)
+
+
+class PendingGalleries(set):
+    """The ids of the galleries to recount when the transaction commits."""
+
+    def recount(self):
+        gallery_ids = set(self)
+        self.clear()
+        update_file_counts(gallery_ids)
+
+
+# the pending galleries of the transaction of each thread, which is the transaction
+# of its connection, since Django opens a connection per thread
+pending_galleries = threading.local()
+
+
+def update_file_counts_on_commit(gallery_id):
+    """Recount the files of the gallery once, when the current transaction commits.
+
+    Saving or deleting many files in one transaction, like deleting a gallery with
+    all its files, then recounts each gallery once instead of once per file, and
+    not at all when the gallery itself was deleted. Outside of a transaction the
+    gallery is recounted right away.
+    """
+    if not transaction.get_connection().in_atomic_block:
+        update_file_counts({gallery_id})
+        return
+    # only the registered callback holds the set, and the thread holds a weak
+    # reference to it, so when Django drops the callback on a rollback the set is
+    # gone too and the next change registers a new one
+    ref = getattr(pending_galleries, "ref", None)
+    pending = ref and ref()
+    if not pending:
+        pending = PendingGalleries()
+        pending_galleries.ref = weakref.ref(pending)
+        transaction.on_commit(pending.recount)
+    pending.add(gallery_id)
+
+
+@receiver(post_save)
+def update_file_counts_on_save(sender, instance, created, update_fields, **kwargs):
+    """Update the file counts of the gallery when a file is added or changes status."""
+    if not isinstance(instance, GalleryFile):
+        return
+    # the background jobs save derived fields often, those do not change the counts
+    if not update_fields or {"status", "gallery"} & set(update_fields):
+        update_file_counts_on_commit(instance.gallery_id)
+    # but thumbnails or metadata from the jobs do change how the file is shown
+    invalidate_gallery(instance.gallery.slug)
+    if not update_fields or "status" in update_fields:
+        bump_generation(f"media:{instance.gallery_id}")
+
+
+@receiver(post_delete)
+def update_file_counts_on_delete(sender, instance, **kwargs):
+    """Update the file counts of the gallery when a file is deleted."""
+    if not isinstance(instance, GalleryFile):
+        return
+    update_file_counts_on_commit(instance.gallery_id)
+
+
+@receiver(pre_save, sender=Gallery)
+def remember_gallery_slug(sender, instance, **kwargs):
+    """Remember the slug of a gallery before it is saved, in case it changes."""
+    instance._saved_slugs = (
+        []
+        if instance._state.adding
+        else list(Gallery.objects.filter(pk=instance.pk).values_list("slug", flat=True))
+    )
+
+
+@receiver(post_save, sender=Gallery)
+def invalidate_gallery_on_save(sender, instance, **kwargs):
+    """Invalidate the cached pages and media permissions of a gallery, also under its old slug."""
+    invalidate_gallery(instance.slug, *getattr(instance, "_saved_slugs", []))
+    bump_generation(f"media:{instance.pk}")
+
+
+@receiver(post_delete, sender=Gallery)
+def invalidate_gallery_on_delete(sender, instance, **kwargs):
+    """Invalidate the cached pages of a deleted gallery."""
+    invalidate_gallery(instance.slug)
+
+
+@receiver(post_save, sender=UUIDTaggedItem)
+@receiver(post_delete, sender=UUIDTaggedItem)
+def invalidate_tagged_object(sender, instance, **kwargs):
+    """Invalidate the cached pages showing the tags of a gallery or file.
+
+    The updated timestamp of a tagged gallery or file is touched, since the cached
+    fragments and the validators of the pages are based on it.
+    """
+    model = instance.content_type.model_class()
+    if model and issubclass(model, Gallery):
+        galleries = Gallery.objects.filter(pk=instance.object_id)
+        galleries.update(updated=timezone.now())
+        slugs = galleries.values_list("slug", flat=True)
+    elif model and issubclass(model, GalleryFile):
+        files = GalleryFile.objects.non_polymorphic().filter(pk=instance.object_id)
+        files.update(updated=timezone.now())
+        slugs = files.values_list("gallery__slug", flat=True)
+    else:
+        return
+    invalidate_gallery(*slugs)
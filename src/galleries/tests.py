@@ -0,0 +1,213 @@
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models import Count
+from django.db.models import Max
+from django.db.models import Q
+from django.test import override_settings
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Gallery
+from .models import GalleryFile
+from .models import StatusChoices
+from pictures.models import Picture
+from pictures.models import Rendition
+from utils.pagination import KeysetPaginator
+from utils.slugify import filter_slugs_in_use
+
+# the patterns of a full table scan in the query plans of each database
+SCAN_PATTERNS = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "sqlite": re.compile(r"\bSCAN (?:TABLE )?(\w+)"),
+}
+
+# queries which can not use an index on some databases. SQLite never uses an index
+# for LIKE with an ESCAPE clause, which Django adds to startswith, while PostgreSQL
+# uses the varchar_pattern_ops index Django makes for slug fields.
+ALLOWED_SCANS = {
+    "sqlite": ["gallery slugs in use"],
+}
+
+
+def get_page(queryset, per_page, key="created", descending=False, cursor=None):
+    """Return the queryset of a page like KeysetPaginator fetches it."""
+    paginator = KeysetPaginator(queryset, per_page, key=key, descending=descending)
+    return paginator.get_queryset(cursor, descending)[: per_page + 1]
+
+
+# the signals bump cache generations while seeding, keep those out of the shared cache
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class QueryPlanTest(TestCase):
+    """Check that the queries run on every page view or upload use indexes.
+
+    The planners of both databases pick plans by the number of rows and the
+    statistics of the tables, so the queries are planned after inserting galleries
+    and pictures and analyzing the tables.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """Insert 5000 pictures with renditions into 500 galleries.
+
+        Half the galleries and most pictures are published, and three of four
+        pictures have a capture time.
+        """
+        cls.owner = get_user_model().objects.create(username="query-plans")
+        cls.galleries = [
+            Gallery.objects.create(
+                owner=cls.owner,
+                name=f"Query plans {i}",
+                slug=f"query-plans-{i}",
+                status=StatusChoices.PUBLISHED if i % 2 else "PENDING_MODERATION",
+            )
+            for i in range(500)
+        ]
+        now = timezone.now()
+        renditions = []
+        for i in range(5000):
+            taken = now - timedelta(hours=i) if i % 4 else None
+            picture = Picture.objects.create(
+                gallery=cls.galleries[i % len(cls.galleries)],
+                title=f"{i}.jpg",
+                original_filename=f"{i}.jpg",
+                original=f"query-plans/{i}.jpg",
+                status=StatusChoices.PUBLISHED if i % 5 else "PENDING_MODERATION",
+                taken=taken,
+                taken_or_created=taken or now,
+            )
+            renditions.append(
+                Rendition(
+                    galleryfile=picture,
+                    name="small",
+                    format="JPEG",
+                    path=f"CACHE/images/query-plans/{picture.pk}.jpg",
+                    width=400,
+                    height=300,
+                    filesize=10000,
+                ),
+            )
+        Rendition.objects.bulk_create(renditions)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def get_hot_queries(self):
+        """Return a dict of the querysets run on every page view or upload, keyed by name.
+
+        These mirror the queries in the views, the paginator, the signals and the
+        media permission checks. Paginated lists are planned for the first page and
+        for a later page, which has the cursor in the WHERE.
+        """
+        gallery = self.galleries[1]
+        picture = Picture.objects.filter(gallery=gallery).first()
+        cursor = (picture.created, picture.uuid)
+        files = GalleryFile.objects.non_polymorphic()
+        published = Q(galleryfiles__status=StatusChoices.PUBLISHED)
+        pages = {
+            "public gallery list": (
+                Gallery.objects.filter(status=StatusChoices.PUBLISHED),
+                50,
+                "created",
+                False,
+            ),
+            "owner gallery list": (
+                Gallery.objects.filter(owner=self.owner),
+                50,
+                "created",
+                False,
+            ),
+            "published files": (
+                files.filter(gallery=gallery, status=StatusChoices.PUBLISHED),
+                6,
+                "created",
+                False,
+            ),
+            "all files": (
+                files.filter(gallery=gallery),
+                settings.GALLERY_MANAGER_DEFAULT_PAGINATE_COUNT,
+                "created",
+                False,
+            ),
+            "published files by capture time": (
+                files.filter(gallery=gallery, status=StatusChoices.PUBLISHED),
+                6,
+                "taken_or_created",
+                False,
+            ),
+            "all files by capture time": (
+                files.filter(gallery=gallery),
+                settings.GALLERY_MANAGER_DEFAULT_PAGINATE_COUNT,
+                "taken_or_created",
+                False,
+            ),
+            "timeline": (
+                Picture.objects.filter(
+                    status=StatusChoices.PUBLISHED,
+                    gallery__status=StatusChoices.PUBLISHED,
+                    taken__isnull=False,
+                ),
+                24,
+                "taken",
+                True,
+            ),
+        }
+        queries = {}
+        for name, (queryset, per_page, key, descending) in pages.items():
+            queries[f"{name} page"] = get_page(queryset, per_page, key, descending)
+            queries[f"{name} later page"] = get_page(
+                queryset, per_page, key, descending, cursor
+            )
+        return {
+            **queries,
+            "gallery by slug": Gallery.objects.filter(
+                slug=gallery.slug, status=StatusChoices.PUBLISHED
+            ),
+            "gallery page validators": Gallery.objects.filter(
+                slug=gallery.slug, status=StatusChoices.PUBLISHED
+            )
+            .annotate(
+                files_updated=Max("galleryfiles__updated", filter=published),
+                files_count=Count("galleryfiles", filter=published),
+            )
+            .values("updated", "files_updated", "files_count"),
+            "gallery slugs in use": filter_slugs_in_use(Gallery.objects.all(), "slug"),
+            "files of a type": files.filter(
+                gallery=gallery,
+                polymorphic_ctype=ContentType.objects.get_for_model(Picture),
+            ),
+            "file counts": files.filter(gallery=gallery)
+            .order_by()
+            .values("polymorphic_ctype", "status")
+            .annotate(count=Count("uuid")),
+            "cover picture": Picture.objects.filter(
+                gallery=gallery, status=StatusChoices.PUBLISHED
+            ).order_by("created", "uuid")[:1],
+            "media permissions": files.filter(uuid=picture.uuid, gallery=gallery)
+            .order_by()
+            .values_list("gallery__status", "status", "gallery__owner_id"),
+            "renditions of files": Rendition.objects.filter(
+                galleryfile_id__in=[picture.uuid]
+            ),
+            "rendition by path": Rendition.objects.filter(
+                path=f"CACHE/images/query-plans/{picture.pk}.jpg"
+            ),
+        }
+
+    def test_hot_queries_use_indexes(self):
+        """No hot query scans a whole table."""
+        pattern = SCAN_PATTERNS.get(connection.vendor)
+        if not pattern:
+            self.skipTest(f"Query plans of {connection.vendor} are not supported")
+        allowed = ALLOWED_SCANS.get(connection.vendor, [])
+        for name, queryset in self.get_hot_queries().items():
+            if name in allowed:
+                continue
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertFalse(pattern.findall(plan), f"full scan in:\n{plan}")
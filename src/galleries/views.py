@@ -1,38 +1,106 @@
 import re
 from urllib.parse import quote
 
-import magic
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count
+from django.db.models import Max
+from django.db.models import prefetch_related_objects
+from django.db.models import Q
 from django.http import Http404
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django.shortcuts import redirect
 from django.shortcuts import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.cache import patch_vary_headers
 from django.views.generic import CreateView
 from django.views.generic import DetailView
 from django.views.generic import ListView
 from django.views.generic import UpdateView
 
 from .forms import GalleryCreateForm
+from .ingest import ingest_files
 from .models import Gallery
 from .models import GalleryFile
-from audios.models import Audio
-from documents.models import Document
-from pictures.models import Picture
+from pictures.renditions import negotiate_rendition_path
+from utils.cache import get_generation
+from utils.mixins import CachedPageMixin
+from utils.mixins import ConditionalPageMixin
 from utils.mixins import OwnerOrAdminMixin
-from utils.slugify import unique_slugify
-from videos.models import Video
+from utils.pagination import KeysetPaginationMixin
+from utils.pagination import KeysetPaginator
 
 
-class GalleryManageListView(ListView):
+# the uuids of the gallery and of the file in the path of a media file
+MEDIA_PATH_RE = re.compile(
+    r".*?/gallery_([a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12})/(?:picture|video|audio|document)_([a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}).*?",
+)
+
+
+class GalleryFileOrderingMixin:
+    """Order and paginate the files of a gallery.
+
+    Files can be ordered by upload time or by the time pictures were taken. Files
+    without a capture time, like videos, are ordered by upload time. The uuid breaks
+    ties in both orderings.
+    """
+
+    orderings = {
+        "created": "created",
+        # the capture time is kept on the files, so both orderings use an index
+        "taken": "taken_or_created",
+    }
+
+    def get_ordering(self):
+        order = self.request.GET.get("order")
+        return order if order in self.orderings else "created"
+
+    def get_galleryfile_page(self, queryset, per_page):
+        """Return the requested page of the files with their relations prefetched.
+
+        The pages are fetched with keyset pagination, so deep pages in huge galleries
+        are as fast as the first. The polymorphic queryset fetches the rows of each
+        subclass in one query per type, and the prefetch_lookups of each type, like
+        tags, are then fetched for all the files of that type on the page at once.
+        This keeps the number of queries for a page fixed no matter how many files
+        it shows.
+        """
+        paginator = KeysetPaginator(
+            queryset,
+            per_page,
+            key=self.orderings[self.get_ordering()],
+        )
+        page = paginator.get_page(
+            after=self.request.GET.get("after"),
+            before=self.request.GET.get("before"),
+        )
+        for galleryfile in page.object_list:
+            # the files are all in this gallery, so it does not have to be fetched
+            galleryfile.gallery = self.object
+        for model in {type(galleryfile) for galleryfile in page.object_list}:
+            prefetch_related_objects(
+                [f for f in page.object_list if type(f) is model],
+                *model.prefetch_lookups,
+            )
+        return page
+
+    def get_context_data(self, *args, **kwargs):
+        context = super().get_context_data(*args, **kwargs)
+        context["order"] = self.get_ordering()
+        return context
+
+
+class GalleryManageListView(KeysetPaginationMixin, ListView):
     """List all galleries owned by this user."""
 
     model = Gallery
     template_name = "gallery_manage_list.html"
+    paginate_by = 50
 
     def get_queryset(self, *args, **kwargs):
         """Return QS with all galleries owned by the logged-in user."""
@@ -57,55 +125,27 @@ class GalleryManageCreateView(LoginRequiredMixin, CreateView):
         form = self.get_form(form_class)
         files = request.FILES.getlist("files")
         if form.is_valid():
-            gallery = form.save(commit=False)
-            gallery.owner = request.user
-            gallery.slug = unique_slugify(
-                gallery.name,
-                slugs_in_use=Gallery.objects.all().values_list("slug", flat=True),
-            )
-            gallery.save()
-            # save tags
-            form.save_m2m()
-            # save files
-            for f in files:
-                mime = magic.from_buffer(f.read(), mime=True)
-                if mime in settings.ALLOWED_PICTURE_TYPES:
-                    Picture.objects.create(
-                        gallery=gallery,
-                        original=f,
-                        original_filename=f.name,
-                        title=f.name,
-                    )
-                elif mime in settings.ALLOWED_VIDEO_TYPES:
-                    Video.objects.create(
-                        gallery=gallery,
-                        original=f,
-                        original_filename=f.name,
-                        title=f.name,
-                    )
-                elif mime in settings.ALLOWED_AUDIO_TYPES:
-                    Audio.objects.create(
-                        gallery=gallery,
-                        original=f,
-                        original_filename=f.name,
-                        title=f.name,
-                    )
-                elif mime in settings.ALLOWED_DOCUMENT_TYPES:
-                    Document.objects.create(
-                        gallery=gallery,
-                        original=f,
-                        original_filename=f.name,
-                        title=f.name,
-                    )
-                else:
-                    messages.warning(
-                        request,
-                        f"File type {mime} not supported for file: {f.name} - skipping file",
-                    )
-            if gallery.galleryfiles.exists():
+            with transaction.atomic():
+                gallery = form.save(commit=False)
+                gallery.owner = request.user
+                # the slug is picked from the name when the gallery is saved
+                gallery.save()
+                # save tags
+                form.save_m2m()
+                # save files, the mimetype and checksum are found by the upload
+                # handler while the file is streamed to disk, see utils.upload
+                counts, skipped = ingest_files(gallery, files)
+                if not counts:
+                    transaction.set_rollback(True)
+            for f in skipped:
+                messages.warning(
+                    request,
+                    f"File type {f.detected_mimetype} not supported for file: {f.name} - skipping file",
+                )
+            if counts:
                 messages.success(
                     request,
-                    f"Gallery created! Pictures: {gallery.pictures.count()}, Videos: {gallery.videos.count()}, Audios: {gallery.audios.count()}, Documents: {gallery.documents.count()}",
+                    f"Gallery created! Pictures: {counts['picture']}, Videos: {counts['video']}, Audios: {counts['audio']}, Documents: {counts['document']}",
                 )
                 return redirect(gallery.get_absolute_url())
             else:
@@ -118,7 +158,7 @@ class GalleryManageCreateView(LoginRequiredMixin, CreateView):
         return self.form_invalid(form)
 
 
-class GalleryManageDetailView(OwnerOrAdminMixin, DetailView):
+class GalleryManageDetailView(OwnerOrAdminMixin, GalleryFileOrderingMixin, DetailView):
     """Show a gallery to the owner or an admin."""
 
     model = Gallery
@@ -127,12 +167,10 @@ class GalleryManageDetailView(OwnerOrAdminMixin, DetailView):
     def get_context_data(self, *args, **kwargs):
         """Paginate."""
         context = super().get_context_data(*args, **kwargs)
-        paginator = Paginator(
+        context["page_obj"] = self.get_galleryfile_page(
             self.object.galleryfiles.all(),
             settings.GALLERY_MANAGER_DEFAULT_PAGINATE_COUNT,
         )
-        page_number = self.request.GET.get("page")
-        context["page_obj"] = paginator.get_page(page_number)
         return context
 
 
@@ -204,24 +242,61 @@ class GalleryFileManageUpdateView(OwnerOrAdminMixin, UpdateView):
 # PUBLIC VIEWS ##############################
 
 
-class GalleryPublicListView(ListView):
+class GalleryPublicListView(
+    ConditionalPageMixin, CachedPageMixin, KeysetPaginationMixin, ListView
+):
     """List all published galleries."""
 
     model = Gallery
     template_name = "gallery_public_list.html"
+    paginate_by = 50
+
+    def get_cache_generations(self):
+        return ["galleries"]
 
     def get_queryset(self, *args, **kwargs):
+        """Return QS with all published galleries.
+
+        The file counts and the cover are kept on the gallery, so only the renditions
+        of the covers need a second query.
         """
-        Return QS with all published galleries."""
-        return Gallery.objects.filter(status="PUBLISHED")
+        return (
+            Gallery.objects.filter(status="PUBLISHED")
+            .select_related("cover")
+            .prefetch_related("cover__renditions")
+        )
 
 
-class GalleryPublicDetailView(DetailView):
+class GalleryPublicDetailView(
+    ConditionalPageMixin, CachedPageMixin, GalleryFileOrderingMixin, DetailView
+):
     """Show a gallery."""
 
     model = Gallery
     template_name = "gallery_public_detail.html"
 
+    def get_cache_generations(self):
+        return [f"gallery:{self.kwargs['slug']}"]
+
+    def get_validators(self):
+        """Return the latest updated time of the gallery and its published files, and the number of files."""
+        published = Q(galleryfiles__status="PUBLISHED")
+        gallery = (
+            Gallery.objects.filter(slug=self.kwargs["slug"], status="PUBLISHED")
+            .annotate(
+                files_updated=Max("galleryfiles__updated", filter=published),
+                files_count=Count("galleryfiles", filter=published),
+            )
+            .values("updated", "files_updated", "files_count")
+            .first()
+        )
+        if gallery is None:
+            return None
+        updated = max(
+            gallery["updated"], gallery["files_updated"] or gallery["updated"]
+        )
+        return updated, [gallery["files_count"]]
+
     def get_object(self, *args, **kwargs):
         """Only show this gallery if it is published."""
         return get_object_or_404(Gallery, slug=self.kwargs["slug"], status="PUBLISHED")
@@ -229,54 +304,77 @@ class GalleryPublicDetailView(DetailView):
     def get_context_data(self, *args, **kwargs):
         """Only get published files and paginate."""
         context = super().get_context_data(*args, **kwargs)
-        files = self.object.galleryfiles.filter(status="PUBLISHED")
-        paginator = Paginator(files, 6)
-        page_number = self.request.GET.get("page")
-        context["page_obj"] = paginator.get_page(page_number)
+        context["page_obj"] = self.get_galleryfile_page(
+            self.object.galleryfiles.filter(status="PUBLISHED"),
+            6,
+        )
         return context
 
 
+def get_media_permissions(gallery_uuid, galleryfile_uuid):
+    """Return the gallery status, file status and owner id of a file, or None.
+
+    This is a single primary key query joined to the gallery, and the result is
+    cached briefly since every thumbnail on a page is a request for a media file.
+    The cache key includes a generation which is bumped when the gallery or the file
+    changes, so publishing and unpublishing take effect at once with a shared cache,
+    and within MEDIA_PERMISSION_CACHE_TIMEOUT seconds with a per-process cache.
+    """
+    key = f"bma:media:{gallery_uuid}:{galleryfile_uuid}:{get_generation(f'media:{gallery_uuid}')}"
+    permissions = cache.get(key)
+    if permissions is None:
+        permissions = (
+            GalleryFile.objects.non_polymorphic()
+            .filter(uuid=galleryfile_uuid, gallery_id=gallery_uuid)
+            .values_list("gallery__status", "status", "gallery__owner_id")
+            .first()
+        )
+        # cache missing files too, as False, so broken links do not hit the database
+        cache.set(key, permissions or False, settings.MEDIA_PERMISSION_CACHE_TIMEOUT)
+    return permissions or None
+
+
 def AccelMediaView(request, path):
     """This view uses Nginx X-Accel-Redirect to serve files.
 
     This means the request goes to Django and can be validated before telling Nginx what to return.
 
-    In this view we just check if the Gallery is published and return a 404 if not.
+    In this view we just check if the Gallery and the file are published and return a 404 if not.
     """
-    print(path)
-    # check file access by getting Gallery uuid from the path
-    if match := re.match(
-        r".*?/gallery_([a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12})/(?:picture|video|audio|document)_([a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}).*?",
-        path,
-    ):
-        # return 404 if the Gallery containing this file is not published,
+    # check file access by getting the Gallery and file uuids from the path
+    if match := MEDIA_PATH_RE.match(path):
+        permissions = get_media_permissions(*match.groups())
+        if permissions is None:
+            raise Http404("File UUID not found in Gallery")
+
+        # return 404 if the Gallery containing this file or the file is not published,
         # unless the owner of the file or an admin is requesting it
-        try:
-            gallery = Gallery.objects.get(uuid=match.group(1))
-        except Gallery.DoesNotExist:
-            raise Http404("Gallery UUID not found")
-
-        if gallery.status != "PUBLISHED":
-            # gallery is not published but we might still want to show the file anyway
-            if gallery.owner != request.user and not request.user.is_superuser:
-                raise Http404("Gallery is not published")
-
-        # return 404 if the file is unpublished
-        try:
-            galleryfile = GalleryFile.objects.get(uuid=match.group(2))
-        except GalleryFile.DoesNotExist:
-            raise Http404("File UUID not found")
-
-        if galleryfile.status != "PUBLISHED":
-            # file is not published but we might still want to show the file anyway
-            if (
-                galleryfile.gallery.owner != request.user
-                and not request.user.is_superuser
-            ):
+        gallery_status, galleryfile_status, owner_id = permissions
+        published = gallery_status == "PUBLISHED" and galleryfile_status == "PUBLISHED"
+        if not published:
+            if owner_id != request.user.pk and not request.user.is_superuser:
                 raise Http404("File is not published")
 
         response = HttpResponse(status=200)
         del response["Content-Type"]
+        rendition = path.startswith(settings.IMAGEKIT_CACHEFILE_DIR)
+        if rendition and path.endswith(".jpg"):
+            # serve a WebP or AVIF variant of the rendition if the client accepts it
+            path = negotiate_rendition_path(path, request.headers.get("Accept", ""))
+            patch_vary_headers(response, ["Accept"])
+        if not published:
+            patch_cache_control(response, private=True, no_cache=True)
+        elif rendition:
+            # renditions can be generated again under the same path, so caches must
+            # check that they are current once the max-age has passed
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=settings.RENDITION_CACHE_MAX_AGE,
+                must_revalidate=True,
+            )
+        # nginx passes these headers on, and answers conditional requests itself
+        # with the ETag and Last-Modified of the file
         response["X-Accel-Redirect"] = f"/public/{quote(path)}"
         return response
     else:
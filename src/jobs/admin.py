@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = [
+        "uuid",
+        "task",
+        "priority",
+        "status",
+        "attempts",
+        "max_attempts",
+        "run_after",
+        "started",
+        "finished",
+        "locked_until",
+        "worker",
+    ]
+    list_filter = ["task", "status"]
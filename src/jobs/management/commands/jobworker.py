@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.models import Job
+from jobs.worker import run_job
+from jobs.worker import setup_worker
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs in a pool of worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count(),
+            help="The number of worker processes. Defaults to the number of CPUs.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=5,
+            help="Seconds to wait before checking the queue again when it is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when the queue is empty instead of waiting for more jobs.",
+        )
+
+    def get_pool(self, processes):
+        """Return a pool of freshly spawned processes.
+
+        The processes are spawned rather than forked so they do not share the
+        database connection of this process.
+        """
+        return ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=setup_worker,
+        )
+
+    def handle(self, *args, **options):
+        processes = options["processes"]
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.stdout.write(f"Starting job worker {worker} with {processes} processes")
+        pool = self.get_pool(processes)
+        running = {}
+        renewed = time.monotonic()
+        try:
+            while True:
+                # renew the leases well before they expire, so the jobs are not
+                # claimed by other workers while they run
+                if (
+                    running
+                    and time.monotonic() - renewed > settings.JOB_LEASE_TIMEOUT / 3
+                ):
+                    Job.objects.renew(list(running.values()), worker=worker)
+                    renewed = time.monotonic()
+                free = processes - len(running)
+                if free:
+                    for uuid in Job.objects.claim(free, worker=worker):
+                        running[pool.submit(run_job, uuid)] = uuid
+                if not running:
+                    if options["once"]:
+                        break
+                    time.sleep(options["sleep"])
+                    continue
+                done, _ = wait(
+                    running,
+                    timeout=options["sleep"],
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    uuid = running.pop(future)
+                    try:
+                        task, status = future.result()
+                    except Exception as e:
+                        # the job crashed the worker process, so record the failure here
+                        Job.objects.get(uuid=uuid).fail(repr(e))
+                        self.stderr.write(f"Job {uuid} crashed: {e!r}")
+                    else:
+                        self.stdout.write(f"Job {uuid} {task}: {status}")
+                if any(isinstance(f.exception(), BrokenProcessPool) for f in done):
+                    # a crashed process breaks the whole pool, start a new one
+                    for future, uuid in running.items():
+                        Job.objects.get(uuid=uuid).fail("Process pool broken")
+                    running = {}
+                    pool.shutdown(wait=False)
+                    pool = self.get_pool(processes)
+        finally:
+            pool.shutdown(cancel_futures=True)
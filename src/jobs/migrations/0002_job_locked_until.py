@@ -0,0 +1,22 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="locked_until",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="A running job is run again by another worker after this time. Renewed while the job runs.",
+                null=True,
+            ),
+        ),
+    ]
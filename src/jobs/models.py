@@ -0,0 +1,181 @@
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.db import transaction
+from django.db.models import F
+from django.db.models import Q
+from django.utils import timezone
+
+from .registry import tasks
+from utils.models import BaseModel
+
+
+class JobStatusChoices(models.TextChoices):
+    QUEUED = ("QUEUED", "Queued")
+    RUNNING = ("RUNNING", "Running")
+    SUCCEEDED = ("SUCCEEDED", "Succeeded")
+    FAILED = ("FAILED", "Failed")
+
+
+class JobManager(models.Manager):
+    def enqueue(self, task, priority=0, max_attempts=3, **kwargs):
+        """Add a job for the task to the queue. The kwargs are passed to the task."""
+        return self.create(
+            task=task,
+            kwargs=kwargs,
+            priority=priority,
+            max_attempts=max_attempts,
+        )
+
+    def claim(self, count, worker):
+        """Mark up to count runnable jobs as running by the worker and return them.
+
+        The rows are locked with SKIP LOCKED so any number of workers can claim jobs
+        concurrently without getting the same job twice. Running jobs whose lease
+        expired, because their worker was killed, are claimed again, or failed if
+        they have no attempts left.
+        """
+        now = timezone.now()
+        expired = Q(status="RUNNING", locked_until__lt=now)
+        with transaction.atomic():
+            self.filter(expired, attempts__gte=F("max_attempts")).update(
+                status="FAILED",
+                error="The worker running the job was lost",
+                finished=now,
+                updated=now,
+            )
+            uuids = list(
+                self.select_for_update(skip_locked=True)
+                .filter(Q(status="QUEUED", run_after__lte=now) | expired)
+                .order_by("-priority", "run_after")
+                .values_list("uuid", flat=True)[:count],
+            )
+            self.filter(uuid__in=uuids).update(
+                status="RUNNING",
+                attempts=F("attempts") + 1,
+                started=now,
+                locked_until=now + timedelta(seconds=settings.JOB_LEASE_TIMEOUT),
+                worker=worker,
+            )
+        return uuids
+
+    def renew(self, uuids, worker):
+        """Extend the lease of the running jobs of the worker."""
+        return self.filter(uuid__in=uuids, status="RUNNING", worker=worker).update(
+            locked_until=timezone.now() + timedelta(seconds=settings.JOB_LEASE_TIMEOUT),
+        )
+
+
+class Job(BaseModel):
+    """A unit of background work, like generating thumbnails for an uploaded file.
+
+    Jobs are run by the jobworker management command. Failed jobs are retried with an
+    exponential backoff until max_attempts is reached.
+    """
+
+    class Meta:
+        ordering = ["-priority", "run_after"]
+        indexes = [
+            models.Index(
+                fields=["status", "-priority", "run_after"],
+                name="jobs_job_runnable_idx",
+            ),
+        ]
+
+    objects = JobManager()
+
+    task = models.CharField(
+        max_length=100,
+        help_text="The name of the registered task this job runs.",
+    )
+
+    kwargs = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="The keyword arguments the task is called with.",
+    )
+
+    priority = models.SmallIntegerField(
+        default=0,
+        help_text="Jobs with a higher priority run first.",
+    )
+
+    status = models.CharField(
+        max_length=20,
+        choices=JobStatusChoices.choices,
+        default="QUEUED",
+        help_text="The status of this job.",
+    )
+
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="The number of times this job has been started.",
+    )
+
+    max_attempts = models.PositiveSmallIntegerField(
+        default=3,
+        help_text="The number of times this job is attempted before it fails.",
+    )
+
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        help_text="The job will not be run before this time.",
+    )
+
+    started = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="The date and time when this job was last started.",
+    )
+
+    finished = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="The date and time when this job last finished.",
+    )
+
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="A running job is run again by another worker after this time. Renewed while the job runs.",
+    )
+
+    worker = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="The worker which last ran this job.",
+    )
+
+    error = models.TextField(
+        blank=True,
+        help_text="The traceback of the last failed attempt.",
+    )
+
+    def __str__(self):
+        return f"{self.task} ({self.uuid})"
+
+    def run(self):
+        """Run the task and record the result, retrying later if it fails."""
+        try:
+            tasks[self.task](**self.kwargs)
+        except Exception:
+            self.fail(traceback.format_exc())
+        else:
+            self.status = "SUCCEEDED"
+            self.finished = timezone.now()
+            self.save(update_fields=["status", "finished", "updated"])
+
+    def fail(self, error):
+        """Record a failed attempt and queue the job again unless it has no attempts left."""
+        self.error = error
+        if self.attempts < self.max_attempts:
+            self.status = "QUEUED"
+            self.run_after = timezone.now() + timedelta(
+                seconds=30 * 2**self.attempts,
+            )
+        else:
+            self.status = "FAILED"
+        self.finished = timezone.now()
+        self.save(update_fields=["status", "error", "run_after", "finished", "updated"])
@@ -0,0 +1,16 @@
+# a mapping of task names to the functions run by the job worker
+tasks = {}
+
+
+def register(name):
+    """Register the decorated function as the job task with this name.
+
+    Tasks live in a tasks.py module in each app and are called with the args of the
+    Job as keyword arguments. Raising an exception makes the job be retried.
+    """
+
+    def decorator(func):
+        tasks[name] = func
+        return func
+
+    return decorator
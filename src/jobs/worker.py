@@ -0,0 +1,24 @@
+"""Functions run in the job worker processes.
+
+The worker processes are spawned rather than forked, so this module must not import
+any models at the top level, since it is imported before Django is set up.
+"""
+
+
+def setup_worker():
+    """Initialise Django in a freshly spawned worker process."""
+    import django
+
+    django.setup()
+
+
+def run_job(uuid):
+    """Run a single claimed job and return the task name and the new status."""
+    from django.db import connections
+
+    from jobs.models import Job
+
+    job = Job.objects.get(uuid=uuid)
+    job.run()
+    connections.close_all()
+    return job.task, job.status
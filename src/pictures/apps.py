@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PicturesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "pictures"
+
+    def ready(self):
+        # connect the signal receivers
+        from . import signals  # noqa: F401
@@ -0,0 +1,39 @@
+from imagekit.cachefiles.backends import CacheFileState
+from imagekit.cachefiles.backends import Simple
+
+
+class RenditionCacheFileBackend(Simple):
+    """An imagekit cachefile backend which uses the Rendition table as existence index.
+
+    The Simple backend checks storage for every cachefile which is not in the cache,
+    which is a filesystem stat or a network round trip per URL. Renditions which
+    have a row in the Rendition table are known to exist without asking storage.
+    Other cachefiles, like the ones imagekit generates on demand, fall back to the
+    Simple behaviour.
+    """
+
+    def get_prefetched_paths(self, file):
+        """Return the set of rendition paths of the source file, if the renditions are prefetched.
+
+        Pages of files prefetch the renditions, so checking against them does not
+        need a query per URL.
+        """
+        source = getattr(file.generator, "source", None)
+        instance = getattr(source, "instance", None)
+        prefetched = getattr(instance, "_prefetched_objects_cache", {})
+        if "renditions" in prefetched:
+            return {rendition.path for rendition in prefetched["renditions"]}
+        return None
+
+    def get_state(self, file, check_if_unknown=True):
+        from .models import Rendition
+
+        if file.name:
+            paths = self.get_prefetched_paths(file)
+            if paths is None:
+                exists = Rendition.objects.filter(path=file.name).exists()
+            else:
+                exists = file.name in paths
+            if exists:
+                return CacheFileState.EXISTS
+        return super().get_state(file, check_if_unknown=check_if_unknown)
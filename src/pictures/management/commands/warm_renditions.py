@@ -0,0 +1,170 @@
+import multiprocessing
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from galleries.models import StatusChoices
+from jobs.worker import setup_worker
+from pictures.models import Picture
+from pictures.renditions import warm_renditions
+
+
+class Command(BaseCommand):
+    help = "Generate missing picture renditions in parallel, to warm the cache before visitors arrive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--gallery",
+            action="append",
+            default=[],
+            help="Only pictures in the gallery with this UUID or slug. Can be given more than once.",
+        )
+        parser.add_argument(
+            "--status",
+            choices=StatusChoices.values,
+            help="Only pictures with this status.",
+        )
+        parser.add_argument(
+            "--since",
+            type=parse_datetime,
+            help="Only pictures created at or after this date and time.",
+        )
+        parser.add_argument(
+            "--until",
+            type=parse_datetime,
+            help="Only pictures created before this date and time.",
+        )
+        parser.add_argument(
+            "--after",
+            help="Resume after the picture with this UUID, as printed in the progress output.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Generate the renditions even if they already exist.",
+        )
+        parser.add_argument(
+            "--check-storage",
+            action="store_true",
+            help="Also check that the rendition files exist in storage, like after a restore. This is slower.",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count(),
+            help="The number of worker processes. Defaults to the number of CPUs.",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            help="The maximum number of pictures to process per second.",
+        )
+
+    def get_queryset(self, options):
+        """Return the pictures to process, in a stable order so the run can be resumed."""
+        pictures = Picture.objects.order_by("created", "uuid")
+        if options["gallery"]:
+            uuids = []
+            for gallery in options["gallery"]:
+                try:
+                    uuids.append(uuid.UUID(gallery))
+                except ValueError:
+                    pass
+            pictures = pictures.filter(
+                Q(gallery__slug__in=options["gallery"]) | Q(gallery__uuid__in=uuids),
+            )
+        if options["status"]:
+            pictures = pictures.filter(status=options["status"])
+        if options["since"]:
+            pictures = pictures.filter(created__gte=options["since"])
+        if options["until"]:
+            pictures = pictures.filter(created__lt=options["until"])
+        if options["after"]:
+            try:
+                after = Picture.objects.get(uuid=options["after"])
+            except Picture.DoesNotExist:
+                raise CommandError(f"Picture {options['after']} not found")
+            pictures = pictures.filter(
+                Q(created__gt=after.created)
+                | Q(created=after.created, uuid__gt=after.uuid),
+            )
+        return pictures.values_list("uuid", flat=True)
+
+    def handle(self, *args, **options):
+        uuids = self.get_queryset(options)
+        total = uuids.count()
+        self.stdout.write(f"Checking renditions for {total} pictures")
+        interval = 1 / options["rate"] if options["rate"] else 0
+        processes = options["processes"]
+        pool = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=setup_worker,
+        )
+        running = {}
+        # the pictures in submission order which are not yet known to be finished
+        pending = deque()
+        finished = set()
+        resume_after = None
+        checked = generated = failed = 0
+        start = time.monotonic()
+        last_submit = 0
+
+        def collect(futures):
+            nonlocal checked, generated, failed, resume_after
+            for future in futures:
+                picture_uuid = running.pop(future)
+                finished.add(picture_uuid)
+                checked += 1
+                try:
+                    generated += future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"Picture {picture_uuid} failed: {e!r}")
+                # all pictures up to this one are done, so a run can resume after it
+                while pending and pending[0] in finished:
+                    resume_after = pending.popleft()
+                    finished.remove(resume_after)
+                if checked % 100 == 0 or checked == total:
+                    elapsed = time.monotonic() - start
+                    self.stdout.write(
+                        f"{checked}/{total} checked, {generated} generated, "
+                        f"{failed} failed, {checked / elapsed:.1f} pictures/s, "
+                        f"resume with --after {resume_after}",
+                    )
+
+        with pool:
+            # the uuids are fetched in chunks so huge archives do not fill memory
+            for picture_uuid in uuids.iterator(chunk_size=1000):
+                if len(running) >= processes * 2:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    collect(done)
+                if interval:
+                    time.sleep(max(0, last_submit + interval - time.monotonic()))
+                    last_submit = time.monotonic()
+                future = pool.submit(
+                    warm_renditions,
+                    picture_uuid,
+                    options["force"],
+                    options["check_storage"],
+                )
+                running[future] = picture_uuid
+                pending.append(picture_uuid)
+            collect(wait(running).done)
+
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done in {elapsed:.1f}s: {generated} pictures generated, "
+                f"{checked - generated - failed} already complete, {failed} failed",
+            ),
+        )
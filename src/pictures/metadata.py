@@ -0,0 +1,150 @@
+import math
+from datetime import datetime
+from decimal import Decimal
+from fractions import Fraction
+
+from django.utils import timezone
+from PIL import Image
+
+# EXIF tags and IFDs used below, see https://exiftool.org/TagNames/EXIF.html
+EXIF_IFD = 0x8769
+GPS_IFD = 0x8825
+MAKE = 0x010F
+MODEL = 0x0110
+ORIENTATION = 0x0112
+DATETIME = 0x0132
+EXPOSURE_TIME = 0x829A
+F_NUMBER = 0x829D
+ISO = 0x8827
+DATETIME_ORIGINAL = 0x9003
+OFFSET_TIME_ORIGINAL = 0x9011
+FOCAL_LENGTH = 0x920A
+GPS_LATITUDE_REF = 1
+GPS_LATITUDE = 2
+GPS_LONGITUDE_REF = 3
+GPS_LONGITUDE = 4
+
+
+def parse_datetime(value, offset=None):
+    """Parse an EXIF datetime, using the offset if given or else the default timezone."""
+    try:
+        taken = datetime.strptime(value.strip("\x00 "), "%Y:%m:%d %H:%M:%S")
+    except (AttributeError, ValueError):
+        return None
+    if offset:
+        try:
+            return datetime.strptime(
+                f"{taken.isoformat()}{offset.strip()}",
+                "%Y-%m-%dT%H:%M:%S%z",
+            )
+        except ValueError:
+            pass
+    return timezone.make_aware(taken)
+
+
+def to_float(value):
+    """Convert an EXIF rational to a float, or None if it is missing or invalid."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    # rationals with a zero denominator become nan
+    return value if math.isfinite(value) else None
+
+
+def fit_decimal(value, field):
+    """Round the number to the decimal places of the DecimalField, or return None if it does not fit."""
+    value = round(Decimal(value), field.decimal_places)
+    if abs(value) >= 10 ** (field.max_digits - field.decimal_places):
+        return None
+    return value
+
+
+def parse_coordinate(value, ref, limit, field):
+    """Convert EXIF GPS degrees, minutes and seconds to signed decimal degrees.
+
+    The limit is 90 for latitudes and 180 for longitudes, and coordinates beyond it
+    or which do not fit the DecimalField are invalid.
+    """
+    try:
+        degrees, minutes, seconds = (to_float(x) for x in value)
+        coordinate = degrees + minutes / 60 + seconds / 3600
+    except (TypeError, ValueError):
+        return None
+    if ref in ("S", "W"):
+        coordinate = -coordinate
+    coordinate = fit_decimal(coordinate, field)
+    if coordinate is None or abs(coordinate) > limit:
+        return None
+    return coordinate
+
+
+def to_decimal(value, field):
+    """Convert an EXIF rational to a Decimal which fits the DecimalField, or None."""
+    value = to_float(value)
+    if value is None:
+        return None
+    return fit_decimal(value, field)
+
+
+def extract_metadata(picture):
+    """Read the EXIF metadata of the original picture into the model fields.
+
+    Only the headers of the file are read, the picture is not decoded.
+    """
+    with picture.original.open("rb") as f:
+        exif = Image.open(f).getexif()
+    exif_ifd = exif.get_ifd(EXIF_IFD)
+    gps_ifd = exif.get_ifd(GPS_IFD)
+
+    picture.taken = parse_datetime(
+        exif_ifd.get(DATETIME_ORIGINAL) or exif.get(DATETIME),
+        exif_ifd.get(OFFSET_TIME_ORIGINAL),
+    )
+    picture.camera_make = str(exif.get(MAKE, "")).strip("\x00 ")[:100]
+    picture.camera_model = str(exif.get(MODEL, "")).strip("\x00 ")[:100]
+    picture.orientation = (
+        exif.get(ORIENTATION) if exif.get(ORIENTATION) in range(1, 9) else None
+    )
+    picture.latitude = parse_coordinate(
+        gps_ifd.get(GPS_LATITUDE),
+        gps_ifd.get(GPS_LATITUDE_REF),
+        90,
+        picture._meta.get_field("latitude"),
+    )
+    picture.longitude = parse_coordinate(
+        gps_ifd.get(GPS_LONGITUDE),
+        gps_ifd.get(GPS_LONGITUDE_REF),
+        180,
+        picture._meta.get_field("longitude"),
+    )
+    exposure_time = to_float(exif_ifd.get(EXPOSURE_TIME))
+    if exposure_time:
+        picture.exposure_time = str(Fraction(exposure_time).limit_denominator(10000))
+    else:
+        picture.exposure_time = ""
+    picture.f_number = to_decimal(
+        exif_ifd.get(F_NUMBER), picture._meta.get_field("f_number")
+    )
+    iso = exif_ifd.get(ISO)
+    picture.iso = iso[0] if isinstance(iso, tuple) else iso
+    picture.focal_length = to_decimal(
+        exif_ifd.get(FOCAL_LENGTH), picture._meta.get_field("focal_length")
+    )
+    picture.taken_or_created = picture.taken or picture.created
+    picture.save(
+        update_fields=[
+            "taken",
+            "taken_or_created",
+            "camera_make",
+            "camera_model",
+            "orientation",
+            "latitude",
+            "longitude",
+            "exposure_time",
+            "f_number",
+            "iso",
+            "focal_length",
+            "updated",
+        ],
+    )
@@ -0,0 +1,114 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("galleries", "0007_uploadsession"),
+        ("pictures", "0003_alter_picture_original"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="picture",
+            name="original_format",
+            field=models.CharField(
+                blank=True,
+                help_text="The image format of the original picture, like JPEG or PNG.",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="picture",
+            name="original_height",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="The height of the original picture in pixels.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="picture",
+            name="original_width",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="The width of the original picture in pixels.",
+                null=True,
+            ),
+        ),
+        migrations.CreateModel(
+            name="Rendition",
+            fields=[
+                (
+                    "uuid",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "name",
+                    models.CharField(
+                        help_text="The name of the rendition size, like small_thumbnail.",
+                        max_length=50,
+                    ),
+                ),
+                (
+                    "format",
+                    models.CharField(
+                        help_text="The image format of the rendition, like JPEG.",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "path",
+                    models.CharField(
+                        help_text="The storage path of the rendition file.",
+                        max_length=255,
+                    ),
+                ),
+                (
+                    "width",
+                    models.PositiveIntegerField(
+                        help_text="The width of the rendition in pixels."
+                    ),
+                ),
+                (
+                    "height",
+                    models.PositiveIntegerField(
+                        help_text="The height of the rendition in pixels."
+                    ),
+                ),
+                (
+                    "filesize",
+                    models.PositiveBigIntegerField(
+                        help_text="The size of the rendition file in bytes."
+                    ),
+                ),
+                (
+                    "galleryfile",
+                    models.ForeignKey(
+                        help_text="The file this is a rendition of.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="renditions",
+                        to="galleries.galleryfile",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="rendition",
+            constraint=models.UniqueConstraint(
+                fields=("galleryfile", "name", "format"),
+                name="pictures_rendition_unique",
+            ),
+        ),
+    ]
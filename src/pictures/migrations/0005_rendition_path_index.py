@@ -0,0 +1,22 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pictures", "0004_rendition"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="rendition",
+            name="path",
+            field=models.CharField(
+                db_index=True,
+                help_text="The storage path of the rendition file.",
+                max_length=255,
+            ),
+        ),
+    ]
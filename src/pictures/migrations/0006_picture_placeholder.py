@@ -0,0 +1,21 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pictures", "0005_rendition_path_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="picture",
+            name="placeholder",
+            field=models.TextField(
+                blank=True,
+                help_text="A tiny blurry version of the picture as a data URI, shown while the picture loads.",
+            ),
+        ),
+    ]
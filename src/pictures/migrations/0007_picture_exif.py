@@ -0,0 +1,113 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pictures", "0006_picture_placeholder"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="picture",
+            name="camera_make",
+            field=models.CharField(
+                blank=True,
+                help_text="The make of the camera, from the EXIF metadata.",
+                max_length=100,
+            ),
+        ),
+        migrations.AddField(
+            model_name="picture",
+            name="camera_model",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="The model of the camera, from the EXIF metadata.",
+                max_length=100,
+            ),
+        ),
+        migrations.AddField(
+            model_name="picture",
+            name="exposure_time",
+            field=models.CharField(
+                blank=True,
+                help_text="The exposure time in seconds, like 1/250, from the EXIF metadata.",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="picture",
+            name="f_number",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=1,
+                help_text="The aperture f-number, from the EXIF metadata.",
+                max_digits=5,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="picture",
+            name="focal_length",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=1,
+                help_text="The focal length in mm, from the EXIF metadata.",
+                max_digits=6,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="picture",
+            name="iso",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="The ISO speed, from the EXIF metadata.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="picture",
+            name="latitude",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=6,
+                help_text="The GPS latitude where the picture was taken, from the EXIF metadata.",
+                max_digits=9,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="picture",
+            name="longitude",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=6,
+                help_text="The GPS longitude where the picture was taken, from the EXIF metadata.",
+                max_digits=9,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="picture",
+            name="orientation",
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                help_text="The EXIF orientation of the picture, 1-8.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="picture",
+            name="taken",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text="The date and time the picture was taken, from the EXIF metadata.",
+                null=True,
+            ),
+        ),
+    ]
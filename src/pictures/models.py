@@ -1,30 +1,182 @@
 from pathlib import Path
 
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django.db import models
+from django.utils.functional import cached_property
 from imagekit.models import ImageSpecField
 from imagekit.processors import ResizeToFit
 from taggit.managers import TaggableManager
 
+from .renditions import RENDITIONS
 from galleries.models import GalleryFile
+from utils.models import BaseModel
 from utils.models import UUIDTaggedItem
 
 
 def get_picture_upload_path(instance, filename):
     """Return the upload path under MEDIA_ROOT for this picture."""
     return Path(
-        f"pictures/user_{instance.gallery.owner.id}/gallery_{instance.gallery.uuid}/picture_{instance.uuid}{Path(filename).suffix.lower()}",
+        f"pictures/user_{instance.gallery.owner_id}/gallery_{instance.gallery.uuid}/picture_{instance.uuid}{Path(filename).suffix.lower()}",
     )
 
 
-class Picture(GalleryFile):
+# the renditions offered to browsers in srcset attributes
+SRCSET_RENDITIONS = ["large_thumbnail", "small", "medium", "large", "slideshow"]
+
+
+class RenditionsMixin:
+    """Access to the Rendition rows of a GalleryFile for templates.
+
+    Use prefetch_related("renditions") when listing files, so all of this is
+    built from the prefetched rows without further queries.
+    """
+
+    @cached_property
+    def renditions_by_format(self):
+        """Return a dict of dicts of the renditions of this file keyed by format and name."""
+        renditions = {}
+        for rendition in self.renditions.all():
+            renditions.setdefault(rendition.format, {})[rendition.name] = rendition
+        return renditions
+
+    @cached_property
+    def srcsets(self):
+        """Return a dict of srcset attribute values for the web sizes keyed by format.
+
+        The formats are in the order of PICTURE_RENDITION_VARIANT_FORMATS with JPEG
+        last, since browsers use the first <source> of a type they support.
+        """
+        srcsets = {}
+        for fmt in [*settings.PICTURE_RENDITION_VARIANT_FORMATS, "JPEG"]:
+            renditions = self.renditions_by_format.get(fmt)
+            if renditions:
+                srcsets[fmt] = ", ".join(
+                    f"{self.get_media_url(renditions[name].path)} {renditions[name].width}w"
+                    for name in SRCSET_RENDITIONS
+                    if name in renditions
+                )
+        return srcsets
+
+    @property
+    def renditions_by_name(self):
+        """Return a dict of the JPEG renditions of this file keyed by name."""
+        return self.renditions_by_format.get("JPEG", {})
+
+    @cached_property
+    def rendition_urls(self):
+        """Return a dict of the URLs of the JPEG renditions of this file keyed by name."""
+        return {
+            name: self.get_media_url(rendition.path)
+            for name, rendition in self.renditions_by_name.items()
+        }
+
+
+class Picture(RenditionsMixin, GalleryFile):
     """The Picture model."""
 
+    ingest_tasks = ["pictures.generate_thumbnails", "pictures.extract_metadata"]
+    prefetch_lookups = ["tags", "renditions"]
+
     original = models.ImageField(
         upload_to=get_picture_upload_path,
         max_length=255,
         help_text="The original uploaded picture file.",
     )
 
+    original_width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="The width of the original picture in pixels.",
+    )
+
+    original_height = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="The height of the original picture in pixels.",
+    )
+
+    original_format = models.CharField(
+        max_length=10,
+        blank=True,
+        help_text="The image format of the original picture, like JPEG or PNG.",
+    )
+
+    taken = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="The date and time the picture was taken, from the EXIF metadata.",
+    )
+
+    camera_make = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="The make of the camera, from the EXIF metadata.",
+    )
+
+    camera_model = models.CharField(
+        max_length=100,
+        blank=True,
+        db_index=True,
+        help_text="The model of the camera, from the EXIF metadata.",
+    )
+
+    orientation = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        help_text="The EXIF orientation of the picture, 1-8.",
+    )
+
+    latitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        null=True,
+        blank=True,
+        help_text="The GPS latitude where the picture was taken, from the EXIF metadata.",
+    )
+
+    longitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        null=True,
+        blank=True,
+        help_text="The GPS longitude where the picture was taken, from the EXIF metadata.",
+    )
+
+    exposure_time = models.CharField(
+        max_length=20,
+        blank=True,
+        help_text="The exposure time in seconds, like 1/250, from the EXIF metadata.",
+    )
+
+    f_number = models.DecimalField(
+        max_digits=5,
+        decimal_places=1,
+        null=True,
+        blank=True,
+        help_text="The aperture f-number, from the EXIF metadata.",
+    )
+
+    iso = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="The ISO speed, from the EXIF metadata.",
+    )
+
+    focal_length = models.DecimalField(
+        max_digits=6,
+        decimal_places=1,
+        null=True,
+        blank=True,
+        help_text="The focal length in mm, from the EXIF metadata.",
+    )
+
+    placeholder = models.TextField(
+        blank=True,
+        help_text="A tiny blurry version of the picture as a data URI, shown while the picture loads.",
+    )
+
     small_thumbnail = ImageSpecField(
         source="original",
         processors=[ResizeToFit(100, 100)],
@@ -71,3 +223,74 @@ class Picture(GalleryFile):
         through=UUIDTaggedItem,
         help_text="The tags for this picture",
     )
+
+    @cached_property
+    def rendition_urls(self):
+        """Return a dict of the URLs of the JPEG renditions of this picture keyed by name.
+
+        The URLs are built from the Rendition rows, so storage is not consulted.
+        Renditions without a row fall back to the ImageSpecField, which makes sure
+        the file exists, and are not signed.
+        """
+        renditions = self.renditions_by_name
+        return {
+            name: self.get_media_url(renditions[name].path)
+            if name in renditions
+            else getattr(self, name).url
+            for name in RENDITIONS
+        }
+
+
+class Rendition(BaseModel):
+    """A generated resized version of a GalleryFile.
+
+    The dimensions and size are saved when the rendition is generated, so they can
+    be shown without opening the file.
+    """
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["galleryfile", "name", "format"],
+                name="pictures_rendition_unique",
+            ),
+        ]
+
+    galleryfile = models.ForeignKey(
+        "galleries.GalleryFile",
+        on_delete=models.CASCADE,
+        related_name="renditions",
+        help_text="The file this is a rendition of.",
+    )
+
+    name = models.CharField(
+        max_length=50,
+        help_text="The name of the rendition size, like small_thumbnail.",
+    )
+
+    format = models.CharField(
+        max_length=10,
+        help_text="The image format of the rendition, like JPEG.",
+    )
+
+    path = models.CharField(
+        max_length=255,
+        db_index=True,
+        help_text="The storage path of the rendition file.",
+    )
+
+    width = models.PositiveIntegerField(
+        help_text="The width of the rendition in pixels.",
+    )
+
+    height = models.PositiveIntegerField(
+        help_text="The height of the rendition in pixels.",
+    )
+
+    filesize = models.PositiveBigIntegerField(
+        help_text="The size of the rendition file in bytes.",
+    )
+
+    @property
+    def url(self):
+        return default_storage.url(self.path)
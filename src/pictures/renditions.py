@@ -0,0 +1,255 @@
+import base64
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from imagekit.cachefiles.backends import CacheFileState
+from pilkit.processors import ProcessorPipeline
+from pilkit.utils import img_to_fobj
+from PIL import Image
+
+try:
+    # registers the AVIF format with Pillow
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+# the ImageSpecFields of the Picture model, largest first
+RENDITIONS = [
+    "slideshow",
+    "large",
+    "medium",
+    "small",
+    "large_thumbnail",
+    "medium_thumbnail",
+    "small_thumbnail",
+]
+
+
+# the mimetypes of the image formats renditions can be generated in
+FORMAT_MIMETYPES = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "AVIF": "image/avif",
+}
+
+
+def get_variant_formats():
+    """Return the extra rendition formats from settings which Pillow can write."""
+    return [
+        fmt for fmt in settings.PICTURE_RENDITION_VARIANT_FORMATS if fmt in Image.SAVE
+    ]
+
+
+def get_variant_path(path, fmt):
+    """Return the path of the variant in another format of the rendition at path."""
+    return str(Path(path).with_suffix(f".{fmt.lower()}"))
+
+
+def get_accepted_mimetypes(accept):
+    """Return the set of mimetypes in the Accept header which are not refused with q=0."""
+    accepted = set()
+    for item in accept.split(","):
+        mimetype, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if mimetype and quality > 0:
+            accepted.add(mimetype.lower())
+    return accepted
+
+
+def negotiate_rendition_path(path, accept):
+    """Return the path of the best variant of the rendition at path for the Accept header.
+
+    The preferred variant formats are tried in the order given in settings, and the
+    path itself is returned if the client accepts none of them or no variant exists.
+    Only formats listed by their own mimetype are used, browsers which support the
+    newer formats list them explicitly.
+    """
+    from .models import Rendition
+
+    accepted = get_accepted_mimetypes(accept)
+    candidates = {
+        get_variant_path(path, fmt): fmt
+        for fmt in settings.PICTURE_RENDITION_VARIANT_FORMATS
+        if FORMAT_MIMETYPES[fmt] in accepted
+    }
+    if not candidates:
+        return path
+    existing = set(
+        Rendition.objects.filter(path__in=candidates).values_list("path", flat=True),
+    )
+    for candidate in candidates:
+        if candidate in existing:
+            return candidate
+    return path
+
+
+# the size of the placeholder shown while a picture loads
+PLACEHOLDER_SIZE = (16, 16)
+
+
+def fit_size(size, box):
+    """Return the size of an image of this size resized to fit inside box."""
+    scale = min(box[0] / size[0], box[1] / size[1])
+    return round(size[0] * scale), round(size[1] * scale)
+
+
+def save_rendition(galleryfile, name, image, path, fmt, autoconvert=True, **options):
+    """Write a rendition to storage at path, and in the variant formats next to it.
+
+    Returns the unsaved Rendition objects for the written files.
+    """
+    from .models import Rendition
+
+    files = [(fmt, path, img_to_fobj(image, fmt, autoconvert, **options))]
+    for variant in get_variant_formats():
+        files.append(
+            (
+                variant,
+                get_variant_path(path, variant),
+                img_to_fobj(
+                    image, variant, **settings.PICTURE_RENDITION_OPTIONS[variant]
+                ),
+            ),
+        )
+    renditions = []
+    for file_format, file_path, content in files:
+        if default_storage.exists(file_path):
+            default_storage.delete(file_path)
+        data = content.read()
+        default_storage.save(file_path, ContentFile(data))
+        renditions.append(
+            Rendition(
+                galleryfile=galleryfile,
+                name=name,
+                format=file_format,
+                path=file_path,
+                width=image.width,
+                height=image.height,
+                filesize=len(data),
+            ),
+        )
+    return renditions
+
+
+def save_rendition_rows(renditions):
+    """Insert the Rendition rows, or update them if they already exist."""
+    from .models import Rendition
+
+    Rendition.objects.bulk_create(
+        renditions,
+        update_conflicts=True,
+        unique_fields=["galleryfile_id", "name", "format"],
+        update_fields=["path", "width", "height", "filesize", "updated"],
+    )
+
+
+def generate_renditions(picture):
+    """Decode the original picture once and write all the renditions from it.
+
+    The original is decoded with Pillow draft mode, which lets the JPEG decoder scale
+    the image down by up to 8x while decoding, to the smallest size which is still
+    larger than the largest rendition. The renditions are then made from the largest
+    down, each one resized from the previous, and written to the imagekit cachefile
+    of the ImageSpecField so imagekit will not generate them again.
+
+    The dimensions, size and format of the original and of each rendition are saved
+    in the database, so templates never need to open the files. Each rendition is
+    also saved in the variant formats, like WebP and AVIF, next to the JPEG file.
+    Finally a tiny placeholder is made from the smallest rendition.
+    """
+    cachefiles = [getattr(picture, name) for name in RENDITIONS]
+    with picture.original.open("rb") as f:
+        image = Image.open(f)
+        picture.original_width, picture.original_height = image.size
+        picture.original_format = image.format
+        # processors like ResizeToFit expose the box they resize to
+        boxes = [
+            (p.width, p.height)
+            for cachefile in cachefiles
+            for p in cachefile.generator.processors
+        ]
+        image.draft("RGB", max(fit_size(image.size, box) for box in boxes))
+        image.load()
+
+    source = image
+    renditions = []
+    for name, cachefile in zip(RENDITIONS, cachefiles):
+        generator = cachefile.generator
+        rendition = ProcessorPipeline(generator.processors).process(source)
+        renditions += save_rendition(
+            picture,
+            name,
+            rendition,
+            cachefile.name,
+            generator.format,
+            generator.autoconvert,
+            **(generator.options or {}),
+        )
+        cachefile.cachefile_backend.set_state(cachefile, CacheFileState.EXISTS)
+        # resize the next rendition from this one, unless it was scaled up
+        if rendition.width <= image.width and rendition.height <= image.height:
+            source = rendition
+
+    placeholder = source.copy()
+    placeholder.thumbnail(PLACEHOLDER_SIZE)
+    content = img_to_fobj(placeholder, "JPEG", quality=40)
+    picture.placeholder = (
+        f"data:image/jpeg;base64,{base64.b64encode(content.read()).decode()}"
+    )
+
+    save_rendition_rows(renditions)
+    picture.filesize = picture.original.size
+    picture.save(
+        update_fields=[
+            "original_width",
+            "original_height",
+            "original_format",
+            "placeholder",
+            "filesize",
+            "updated",
+        ],
+    )
+
+
+def get_rendition_paths(picture):
+    """Return the storage paths of all the renditions of the picture in the current specs."""
+    paths = set()
+    for name in RENDITIONS:
+        path = getattr(picture, name).name
+        paths.add(path)
+        paths.update(get_variant_path(path, fmt) for fmt in get_variant_formats())
+    return paths
+
+
+def warm_renditions(uuid, force=False, check_storage=False):
+    """Generate the renditions of a picture if any of them are missing.
+
+    The paths of the Rendition rows are compared to the paths of the current specs,
+    so renditions are generated again when a spec or the variant formats change.
+    With check_storage the files are also checked, to find files lost in a restore.
+    This is run in the worker processes of the warm_renditions management command,
+    so the model is imported here rather than at the top of the module.
+    Returns True if the renditions were generated.
+    """
+    from .models import Picture
+
+    picture = Picture.objects.get(uuid=uuid)
+    if not force:
+        expected = get_rendition_paths(picture)
+        existing = set(picture.renditions.values_list("path", flat=True))
+        missing = expected - existing
+        if check_storage and not missing:
+            missing = {p for p in expected if not default_storage.exists(p)}
+        if not missing:
+            return False
+    generate_renditions(picture)
+    return True
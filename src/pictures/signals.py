@@ -0,0 +1,16 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Rendition
+
+
+@receiver(post_delete, sender=Rendition)
+def delete_rendition_file(sender, instance, **kwargs):
+    """Delete the rendition file when its row is deleted, so the index stays true.
+
+    The file is only deleted when the transaction commits, so it is still there if
+    the deletion of the row is rolled back.
+    """
+    transaction.on_commit(lambda: default_storage.delete(instance.path))
@@ -0,0 +1,16 @@
+from . import metadata
+from .models import Picture
+from .renditions import generate_renditions
+from jobs.registry import register
+
+
+@register("pictures.generate_thumbnails")
+def generate_thumbnails(uuid):
+    """Generate all the renditions of a picture."""
+    generate_renditions(Picture.objects.get(uuid=uuid))
+
+
+@register("pictures.extract_metadata")
+def extract_metadata(uuid):
+    """Save the EXIF metadata of a picture in the database."""
+    metadata.extract_metadata(Picture.objects.get(uuid=uuid))
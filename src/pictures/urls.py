@@ -1 +1,9 @@
 """URL Configuration for the photos app."""
+from django.urls import path
+
+from .views import PictureTimelineView
+
+app_name = "pictures"
+urlpatterns = [
+    path("timeline/", PictureTimelineView.as_view(), name="picture_timeline"),
+]
@@ -0,0 +1,37 @@
+from django.views.generic import ListView
+
+from .models import Picture
+from utils.mixins import CachedPageMixin
+from utils.mixins import ConditionalPageMixin
+from utils.pagination import KeysetPaginationMixin
+
+
+class PictureTimelineView(
+    ConditionalPageMixin, CachedPageMixin, KeysetPaginationMixin, ListView
+):
+    """List published pictures from all published galleries by the time they were taken."""
+
+    model = Picture
+    template_name = "picture_timeline.html"
+    paginate_by = 24
+    keyset_key = "taken"
+    keyset_descending = True
+
+    def get_cache_generations(self):
+        return ["galleries"]
+
+    def get_queryset(self, *args, **kwargs):
+        """Return QS with all published pictures with a capture time, newest first.
+
+        This only uses the indexed EXIF columns, so no files are opened. The gallery
+        is needed to sign the media URLs of the pictures.
+        """
+        return (
+            Picture.objects.filter(
+                status="PUBLISHED",
+                gallery__status="PUBLISHED",
+                taken__isnull=False,
+            )
+            .select_related("gallery")
+            .prefetch_related(*Picture.prefetch_lookups)
+        )
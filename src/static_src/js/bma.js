@@ -1,8 +1,82 @@
 jQuery(document).ready(function () {
     ImgUpload();
     $('#id_files').trigger("change");
+    $('canvas.bma-waveform').each(function () {
+        drawWaveform(this);
+    });
+    $('video').each(function () {
+        showThumbnailPreviews(this);
+    });
 });
 
+/* show the thumbnail of the hovered time from the sprite sheets in the metadata
+   track of a video, over the bottom of the video where the seek bar is */
+function showThumbnailPreviews(video) {
+    var element = video.querySelector('track[kind="metadata"]');
+    if (!element) {
+        return;
+    }
+    var track = element.track;
+    // metadata tracks are disabled by default, and the cues are only loaded when hidden
+    track.mode = "hidden";
+    var preview = document.createElement('div');
+    preview.className = "bma-thumbnail-preview";
+    video.parentNode.insertBefore(preview, video.nextSibling);
+    var seekBarHeight = 40;
+
+    video.addEventListener('mousemove', function (e) {
+        var rect = video.getBoundingClientRect();
+        var cues = track.cues;
+        if (!cues || !cues.length || rect.bottom - e.clientY > seekBarHeight) {
+            preview.style.display = "none";
+            return;
+        }
+        // the duration is not known before the metadata is loaded, the cues cover all of it
+        var duration = isFinite(video.duration) ? video.duration : cues[cues.length - 1].endTime;
+        var time = (e.clientX - rect.left) / rect.width * duration;
+        var cue = Array.prototype.find.call(cues, function (cue) {
+            return cue.startTime <= time && time < cue.endTime;
+        });
+        // the cues look like sprite_001.jpg#xywh=160,0,160,90
+        var match = cue && /^(.+)#xywh=(\d+),(\d+),(\d+),(\d+)$/.exec(cue.text.trim());
+        if (!match) {
+            preview.style.display = "none";
+            return;
+        }
+        var width = parseInt(match[4]);
+        var height = parseInt(match[5]);
+        var x = e.clientX - rect.left - width / 2;
+        preview.style.backgroundImage = 'url("' + new URL(match[1], element.src) + '")';
+        preview.style.backgroundPosition = -match[2] + "px " + -match[3] + "px";
+        preview.style.width = width + "px";
+        preview.style.height = height + "px";
+        preview.style.left = video.offsetLeft + Math.min(Math.max(x, 0), rect.width - width) + "px";
+        preview.style.top = video.offsetTop + video.offsetHeight - seekBarHeight - height + "px";
+        preview.style.display = "block";
+    });
+    video.addEventListener('mouseleave', function () {
+        preview.style.display = "none";
+    });
+}
+
+/* draw the precomputed min/max peaks of an audio file, pairs of signed bytes */
+function drawWaveform(canvas) {
+    fetch(canvas.dataset.peaks).then(function (response) {
+        return response.arrayBuffer();
+    }).then(function (buffer) {
+        var peaks = new Int8Array(buffer);
+        var ctx = canvas.getContext('2d');
+        var middle = canvas.height / 2;
+        var step = canvas.width / (peaks.length / 2);
+        ctx.fillStyle = "#6c757d";
+        for (var i = 0; i < peaks.length; i += 2) {
+            var top = middle - peaks[i + 1] / 128 * middle;
+            var bottom = middle - peaks[i] / 128 * middle;
+            ctx.fillRect(i / 2 * step, top, Math.max(step, 1), Math.max(bottom - top, 1));
+        }
+    });
+}
+
 function ImgUpload() {
     $('#id_files').bind('change', function (e) {
         $(this).closest('.container').find('.upload__img-wrap').remove();
@@ -0,0 +1,75 @@
+import time
+
+from django.core.cache import cache
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def is_shared_cache():
+    """Return True if the cache is shared by all processes, unlike the local memory cache.
+
+    A generation bumped in one process is only seen by the others in a shared cache.
+    """
+    return not isinstance(caches["default"], LocMemCache)
+
+
+def get_generation_key(name):
+    return f"bma:generation:{name}"
+
+
+def get_generation(name):
+    """Return the current generation of a cache namespace, like a gallery.
+
+    Cache keys include the generation of everything the cached value depends on,
+    so bumping a generation invalidates all of them at once without having to find
+    and delete the keys. A new generation starts at the current time in milliseconds,
+    so keys from before an evicted generation can never be reused.
+    """
+    key = get_generation_key(name)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(*names):
+    """Invalidate everything cached in these namespaces."""
+    for name in names:
+        try:
+            cache.incr(get_generation_key(name))
+        except ValueError:
+            # the generation is not in the cache, so nothing cached depends on it
+            pass
+
+
+def get_or_set_locked(key, default, timeout, lock_timeout=30, wait=0.05):
+    """Return the cached value for key, or call default() to compute and cache it.
+
+    Only one process computes a missing value, the others wait for it to appear in
+    the cache for up to lock_timeout seconds, so a popular page which expires does
+    not have every request render it at the same time. The lock uses cache.add(),
+    which is atomic in the local memory and Redis backends, and close enough in the
+    file backend.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+    lock = f"{key}:lock"
+    if cache.add(lock, True, timeout=lock_timeout):
+        try:
+            value = default()
+            cache.set(key, value, timeout=timeout)
+        finally:
+            cache.delete(lock)
+        return value
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(wait)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        if cache.get(lock) is None:
+            # the other process failed, compute it here
+            break
+    return default()
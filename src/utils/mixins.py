@@ -1,4 +1,18 @@
+import hashlib
+import json
+
+from dealer.contrib.django.settings import BACKEND as REVISION_BACKEND
+from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth.mixins import UserPassesTestMixin
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .cache import get_generation
+from .cache import get_or_set_locked
+from .cache import is_shared_cache
+from .signing import get_signed_since
 
 
 class OwnerOrAdminMixin(UserPassesTestMixin):
@@ -9,3 +23,101 @@ class OwnerOrAdminMixin(UserPassesTestMixin):
             return True
         if self.request.user.is_superuser:
             return True
+
+
+class CachedPageMixin:
+    """Cache the rendered page of a view for anonymous visitors.
+
+    The cache key includes the full path, so each page of a paginated view is cached
+    on its own, and the generations returned by get_cache_generations(), so the
+    cached pages are invalidated when anything they show changes. Pages are only
+    cached in a cache shared by all processes, since a generation bumped in one
+    process does not invalidate the local memory caches of the others.
+    """
+
+    def get_cache_generations(self):
+        """Return the names of the cache generations the page depends on."""
+        return []
+
+    def get(self, request, *args, **kwargs):
+        # pages for logged in users or with pending messages are personal
+        if request.user.is_authenticated or len(messages.get_messages(request)):
+            return super().get(request, *args, **kwargs)
+        if not is_shared_cache():
+            return super().get(request, *args, **kwargs)
+        generations = ":".join(
+            f"{name}={get_generation(name)}" for name in self.get_cache_generations()
+        )
+        path = hashlib.sha256(request.get_full_path().encode()).hexdigest()
+        # the ETag from ConditionalPageMixin, so a page is never served from the cache
+        # with the validators of a newer one
+        etag = getattr(self, "page_etag", "")
+        key = f"bma:page:{path}:{generations}:{etag}"
+
+        def render():
+            response = super(CachedPageMixin, self).get(request, *args, **kwargs)
+            response.render()
+            return response.content, response["Content-Type"]
+
+        content, content_type = get_or_set_locked(
+            key,
+            render,
+            timeout=settings.PUBLIC_PAGE_CACHE_TIMEOUT,
+        )
+        return HttpResponse(content, content_type=content_type)
+
+
+class ConditionalPageMixin:
+    """Answer conditional GET requests from anonymous visitors with 304 Not Modified.
+
+    The ETag and Last-Modified validators are computed by get_validators() from the
+    updated timestamps of what the page shows, or from its cache generations, so an
+    unchanged page is neither rendered nor fetched from the cache. Put this before
+    CachedPageMixin in the bases of a view, which then caches the page by its ETag.
+    """
+
+    def get_validators(self):
+        """Return the latest updated time of what the page shows and a list of other values it depends on.
+
+        The default is no updated time and the cache generations of the page, which
+        needs no query but a cache shared by all processes, since a generation bumped
+        in one process is not seen by the others otherwise. Return None to not use
+        validators, for example when the page would be a 404.
+        """
+        if not is_shared_cache():
+            return None
+        return None, [get_generation(name) for name in self.get_cache_generations()]
+
+    def get(self, request, *args, **kwargs):
+        # pages for logged in users or with pending messages are personal
+        if request.user.is_authenticated or len(messages.get_messages(request)):
+            return super().get(request, *args, **kwargs)
+        validators = self.get_validators()
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+        last_modified, versions = validators
+        # the page also changes when the signed media URLs on it do, or on a deploy of
+        # a new revision, from git or the DEALER_REVISION environment variable
+        signed_since = get_signed_since()
+        if signed_since:
+            last_modified = max(filter(None, [last_modified, signed_since]))
+        etag = hashlib.sha256(
+            json.dumps(
+                [
+                    request.get_full_path(),
+                    REVISION_BACKEND.revision,
+                    last_modified,
+                    *versions,
+                ],
+                default=str,
+            ).encode(),
+        ).hexdigest()
+        self.page_etag = etag
+
+        response = condition(
+            etag_func=lambda *args, **kwargs: etag,
+            last_modified_func=lambda *args, **kwargs: last_modified,
+        )(super().get)(request, *args, **kwargs)
+        # caches may store the page, but must check that it is still current
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
@@ -0,0 +1,144 @@
+import base64
+import json
+from datetime import datetime
+from uuid import UUID
+
+from django.db.models import F
+from django.db.models import Q
+
+
+class KeysetPage:
+    """A page of objects from a KeysetPaginator.
+
+    Unlike a Django Page there is no page number or page count, only cursors which
+    point to the pages before and after this one.
+    """
+
+    def __init__(self, object_list, previous_cursor, next_cursor):
+        self.object_list = object_list
+        self.previous_cursor = previous_cursor
+        self.next_cursor = next_cursor
+
+    def __repr__(self):
+        return f"<KeysetPage of {len(self.object_list)} objects>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+
+class KeysetPaginator:
+    """Paginate a queryset by the values of a datetime key and the uuid.
+
+    Each page is fetched with a WHERE on the key of the last row of the previous
+    page and a LIMIT, instead of an OFFSET, so with an index on (key, uuid) every page
+    costs the same no matter how deep it is, and no COUNT(*) is needed. The key can
+    be a field name or an expression and must not be NULL, but only a field which
+    is indexed together with the uuid keeps deep pages fast.
+    """
+
+    def __init__(self, queryset, per_page, key="created", descending=False):
+        self.queryset = queryset.annotate(
+            keyset_key=F(key) if isinstance(key, str) else key
+        )
+        self.per_page = int(per_page)
+        self.descending = descending
+
+    @staticmethod
+    def encode_cursor(obj):
+        """Return the opaque cursor pointing at the object."""
+        value = json.dumps([obj.keyset_key.isoformat(), str(obj.uuid)])
+        return base64.urlsafe_b64encode(value.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Return the key and uuid of a cursor, or None if the cursor is invalid."""
+        try:
+            key, uuid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(key), UUID(uuid)
+        except (TypeError, ValueError, UnicodeError, AttributeError):
+            return None
+
+    def get_queryset(self, cursor=None, descending=False):
+        """Return the queryset in the order of the key, starting after the cursor.
+
+        The cursor is a decoded tuple of a key and a uuid, or None for the start.
+        """
+        queryset = self.queryset
+        if cursor:
+            key, uuid = cursor
+            lookup, bound = ("lt", "lte") if descending else ("gt", "gte")
+            queryset = queryset.filter(
+                Q(**{f"keyset_key__{lookup}": key})
+                | Q(keyset_key=key, **{f"uuid__{lookup}": uuid}),
+                # redundant, but the database can not start an index scan at an OR,
+                # only at a range like this
+                **{f"keyset_key__{bound}": key},
+            )
+        if descending:
+            queryset = queryset.order_by("-keyset_key", "-uuid")
+        else:
+            queryset = queryset.order_by("keyset_key", "uuid")
+        return queryset
+
+    def get_page(self, after=None, before=None):
+        """Return the page after or before the cursor, or the first page.
+
+        Invalid cursors return the first page, like Paginator.get_page() does for
+        invalid page numbers.
+        """
+        before = before and self.decode_cursor(before)
+        after = after and self.decode_cursor(after)
+        cursor = before or after
+        # the page before a cursor is fetched by walking backwards from it
+        descending = self.descending != bool(before)
+        queryset = self.get_queryset(cursor, descending)
+
+        # fetch one extra row to know if there is a page beyond this one
+        object_list = list(queryset[: self.per_page + 1])
+        more = len(object_list) > self.per_page
+        object_list = object_list[: self.per_page]
+        if before:
+            object_list.reverse()
+        if not object_list:
+            return KeysetPage(object_list, None, None)
+        first = self.encode_cursor(object_list[0])
+        last = self.encode_cursor(object_list[-1])
+        if before:
+            return KeysetPage(object_list, first if more else None, last)
+        return KeysetPage(object_list, first if after else None, last if more else None)
+
+
+class KeysetPaginationMixin:
+    """Use a KeysetPaginator in a ListView, with the cursors in the after and before GET parameters."""
+
+    paginator_class = KeysetPaginator
+    keyset_key = "created"
+    keyset_descending = False
+
+    def get_keyset_key(self):
+        return self.keyset_key
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = self.paginator_class(
+            queryset,
+            page_size,
+            key=self.get_keyset_key(),
+            descending=self.keyset_descending,
+        )
+        page = paginator.get_page(
+            after=self.request.GET.get("after"),
+            before=self.request.GET.get("before"),
+        )
+        return paginator, page, page.object_list, page.has_other_pages()
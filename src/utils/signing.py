@@ -0,0 +1,85 @@
+import base64
+import hashlib
+import time
+from datetime import datetime
+from datetime import timezone
+from urllib.parse import unquote
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+
+def get_expires(now=None):
+    """Return the expiry time for a signed URL made now.
+
+    The expiry is rounded up to the next whole MEDIA_URL_LIFETIME and one more,
+    so all URLs for a file made within one lifetime are identical, which keeps them
+    cacheable in browsers and in cached pages, and every URL is valid for at least
+    one lifetime.
+    """
+    now = int(now or time.time())
+    lifetime = settings.MEDIA_URL_LIFETIME
+    return (now // lifetime + 2) * lifetime
+
+
+def is_signing_enabled():
+    """Return True if media URLs are signed for nginx."""
+    return bool(settings.NGINX_PROXY and settings.NGINX_SECURE_LINK_SECRET)
+
+
+def get_signed_since(now=None):
+    """Return when the signed URLs made now were first made, or None if URLs are not signed.
+
+    Pages with signed URLs change at this time, even if nothing they show changed.
+    """
+    if not is_signing_enabled():
+        return None
+    since = get_expires(now) - 2 * settings.MEDIA_URL_LIFETIME
+    return datetime.fromtimestamp(since, tz=timezone.utc)
+
+
+def get_signature(uri, expires):
+    """Return the signature of the URI as checked by the nginx secure_link module.
+
+    This matches the nginx configuration:
+
+        secure_link $arg_md5,$arg_expires;
+        secure_link_md5 "$secure_link_expires$uri <NGINX_SECURE_LINK_SECRET>";
+    """
+    value = f"{expires}{uri} {settings.NGINX_SECURE_LINK_SECRET}"
+    digest = hashlib.md5(value.encode()).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+def get_signed_media_url(name):
+    """Return the URL of the file in storage, signed so nginx can serve it directly.
+
+    URLs are only signed when the site runs behind nginx and a secret is configured,
+    otherwise the plain storage URL is returned.
+    """
+    url = default_storage.url(name)
+    if not is_signing_enabled():
+        return url
+    expires = get_expires()
+    # nginx checks the decoded URI, and storage returns it percent encoded
+    uri = unquote(urlsplit(url).path)
+    return f"{url}?md5={get_signature(uri, expires)}&expires={expires}"
+
+
+def get_signed_directory_url(name):
+    """Return the URL of the file in storage, signed for the whole directory of the file.
+
+    The signature and expiry are in the path instead of the query string, like
+    /media/signed/<signature>/<expires>/videos/video_hls/master.m3u8, so relative
+    URLs in the file, like the segments of an HLS playlist, resolve to the same
+    signed directory and nginx serves them directly too. The signature is of the
+    URI of the directory with a trailing slash, see the nginx config in the README.
+    """
+    url = default_storage.url(name)
+    if not is_signing_enabled():
+        return url
+    expires = get_expires()
+    directory = unquote(urlsplit(url).path).rpartition("/")[0] + "/"
+    base_url = default_storage.base_url
+    return f"{base_url}signed/{get_signature(directory, expires)}/{expires}/{url[len(base_url):]}"
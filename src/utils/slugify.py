@@ -1,25 +1,105 @@
+import re
+
+from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import Q
 from django.utils.text import slugify
 
+# the most digits of a number unique_slugify() appends to a shortened slug
+SUFFIX_DIGITS = 9
+
 
-def unique_slugify(text: str, slugs_in_use: list):
+def unique_slugify(text: str, slugs_in_use, max_length=None):
     """Use Djangos slugify and append a number if the result is in use.
     Unslugable values raise an exception. Conflict handling starts the
-    numbering at 2.
+    numbering at 2. The slug is shortened to fit max_length, also to make
+    room for the number.
     Args:
         text: The input to be slugified
-        slugs_in_use: A list of strings to be checked for conflicts
+        slugs_in_use: A set or other container of strings to be checked for conflicts
+        max_length: The max_length of the slug field, or None
     Returns:
         A string of a slug which doesn't conflict with any existing
     Raises:
         ValueError: When Djangos own slugify() returns falsy output.
     """
-    slug = slugify(text)
-    if not slug:
+    base = slugify(text)[:max_length]
+    if not base:
         raise ValueError("Unable to slugify input")
-    if slug in slugs_in_use:
-        i = 2
-        slug = f"{slug}-{i}"
-        while slug in slugs_in_use:
-            i += 1
-            slug = f"{slug[:-2]}-{i}"
+    slug = base
+    i = 2
+    while slug in slugs_in_use:
+        suffix = f"-{i}"
+        if max_length:
+            slug = base[: max_length - len(suffix)].rstrip("-") + suffix
+        else:
+            slug = base + suffix
+        i += 1
     return slug
+
+
+def filter_slugs_in_use(queryset, slug, field="slug"):
+    """Return the objects in the queryset with the slug slug or slug-N.
+
+    On PostgreSQL the startswith lookup is a range scan on the pattern index Django
+    makes for slug fields, so this does not get slower as the table grows, and the
+    regex only filters that range.
+    """
+    return queryset.filter(
+        Q(**{field: slug})
+        | Q(
+            **{
+                f"{field}__startswith": f"{slug}-",
+                f"{field}__regex": rf"^{re.escape(slug)}-[0-9]+$",
+            }
+        ),
+    )
+
+
+def get_slugs_in_use(queryset, slug, field="slug", max_length=None):
+    """Return the set of slugs in the queryset which are slug or slug-N.
+
+    When slug-N is longer than max_length, unique_slugify() shortens the slug to
+    make room for the number, so then all slugs starting with the slug shortened
+    enough for a number of up to SUFFIX_DIGITS digits are returned.
+    """
+    if max_length and len(slug) > max_length - SUFFIX_DIGITS - 1:
+        prefix = slug[: max_length - SUFFIX_DIGITS - 1].rstrip("-")
+        queryset = queryset.filter(**{f"{field}__startswith": prefix})
+    else:
+        queryset = filter_slugs_in_use(queryset, slug, field)
+    return set(queryset.values_list(field, flat=True))
+
+
+def save_with_unique_slug(instance, text, save, field="slug", attempts=5):
+    """Set a free slug based on the text on the instance and call save().
+
+    The field must be unique. If another process takes the slug between picking it
+    and saving, the unique index raises an IntegrityError and a new slug is picked.
+    Text which can not be slugified, like a name of only punctuation, uses the
+    primary key of the instance instead.
+    Args:
+        instance: The new model instance to save
+        text: The input to be slugified
+        save: A callable which saves the instance
+        field: The name of the slug field
+        attempts: The number of slugs to try before giving up
+    Raises:
+        IntegrityError: When no free slug was found in the attempts.
+    """
+    max_length = instance._meta.get_field(field).max_length
+    base = slugify(text)[:max_length] or slugify(str(instance.pk))[:max_length]
+    queryset = type(instance)._default_manager.all()
+    for attempt in range(attempts):
+        slugs_in_use = get_slugs_in_use(queryset, base, field, max_length)
+        slug = unique_slugify(base, slugs_in_use, max_length)
+        setattr(instance, field, slug)
+        try:
+            # a savepoint, so the surrounding transaction survives a conflict
+            with transaction.atomic():
+                save()
+            return
+        except IntegrityError:
+            # only retry conflicts on the slug, not other integrity errors
+            if attempt == attempts - 1 or not queryset.filter(**{field: slug}).exists():
+                raise
@@ -0,0 +1,38 @@
+import hashlib
+
+import magic
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+# libmagic only needs the first few KB of a file to recognise it
+MAGIC_HEADER_SIZE = 8192
+
+
+class HashingTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploads to disk while detecting the mimetype and hashing the data.
+
+    The mimetype is detected from the first MAGIC_HEADER_SIZE bytes, and the
+    sha256 checksum is updated chunk by chunk, so an upload is never held in
+    memory no matter how large it is. The results are available on the
+    returned TemporaryUploadedFile as the attributes detected_mimetype and
+    sha256, next to the usual size attribute.
+    """
+
+    def new_file(self, *args, **kwargs):
+        """Reset the mimetype buffer and hasher for the next file in the request."""
+        super().new_file(*args, **kwargs)
+        self.header = b""
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        """Buffer the file header for libmagic and hash the chunk before spooling it."""
+        if len(self.header) < MAGIC_HEADER_SIZE:
+            self.header += raw_data[: MAGIC_HEADER_SIZE - len(self.header)]
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        """Attach the detected mimetype and checksum to the uploaded file."""
+        uploaded_file = super().file_complete(file_size)
+        uploaded_file.detected_mimetype = magic.from_buffer(self.header, mime=True)
+        uploaded_file.sha256 = self.hasher.hexdigest()
+        return uploaded_file
@@ -0,0 +1,58 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("videos", "0002_alter_video_original"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="video",
+            name="duration",
+            field=models.DurationField(
+                blank=True, help_text="The duration of the video.", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="video",
+            name="height",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="The height of the original video in pixels.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="video",
+            name="playlist",
+            field=models.FileField(
+                blank=True,
+                help_text="The HLS master playlist of the transcoded renditions.",
+                max_length=255,
+                upload_to="",
+            ),
+        ),
+        migrations.AddField(
+            model_name="video",
+            name="poster",
+            field=models.ImageField(
+                blank=True,
+                help_text="A frame from the video shown before it plays.",
+                max_length=255,
+                upload_to="",
+            ),
+        ),
+        migrations.AddField(
+            model_name="video",
+            name="width",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="The width of the original video in pixels.",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("videos", "0003_video_hls"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="video",
+            name="thumbnails",
+            field=models.FileField(
+                blank=True,
+                help_text="The WebVTT index of the thumbnail sprite sheets used for scrubbing.",
+                max_length=255,
+                upload_to="",
+            ),
+        ),
+    ]
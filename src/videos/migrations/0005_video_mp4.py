@@ -0,0 +1,23 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("videos", "0004_video_thumbnails"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="video",
+            name="mp4",
+            field=models.FileField(
+                blank=True,
+                help_text="A progressive MP4 rendition for browsers which do not play HLS.",
+                max_length=255,
+                upload_to="",
+            ),
+        ),
+    ]
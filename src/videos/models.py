@@ -5,25 +5,82 @@ from taggit.managers import TaggableManager
 
 from galleries.models import GalleryFile
 from utils.models import UUIDTaggedItem
+from utils.signing import get_signed_directory_url
 
 
 def get_video_upload_path(instance, filename):
     """Return the upload path for this video file."""
     return Path(
-        f"videos/user_{instance.gallery.owner.id}/gallery_{instance.gallery.uuid}/video_{instance.uuid}{Path(filename).suffix.lower()}",
+        f"videos/user_{instance.gallery.owner_id}/gallery_{instance.gallery.uuid}/video_{instance.uuid}{Path(filename).suffix.lower()}",
     )
 
 
 class Video(GalleryFile):
     """The Video model."""
 
+    ingest_tasks = ["videos.transcode", "videos.generate_sprites"]
+    media_fields = ["original", "playlist", "mp4", "poster", "thumbnails"]
+
     original = models.FileField(
         upload_to=get_video_upload_path,
         max_length=255,
         help_text="The original uploaded video file.",
     )
 
+    duration = models.DurationField(
+        null=True,
+        blank=True,
+        help_text="The duration of the video.",
+    )
+
+    width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="The width of the original video in pixels.",
+    )
+
+    height = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="The height of the original video in pixels.",
+    )
+
+    playlist = models.FileField(
+        max_length=255,
+        blank=True,
+        help_text="The HLS master playlist of the transcoded renditions.",
+    )
+
+    mp4 = models.FileField(
+        max_length=255,
+        blank=True,
+        help_text="A progressive MP4 rendition for browsers which do not play HLS.",
+    )
+
+    poster = models.ImageField(
+        max_length=255,
+        blank=True,
+        help_text="A frame from the video shown before it plays.",
+    )
+
+    thumbnails = models.FileField(
+        max_length=255,
+        blank=True,
+        help_text="The WebVTT index of the thumbnail sprite sheets used for scrubbing.",
+    )
+
     tags = TaggableManager(
         through=UUIDTaggedItem,
         help_text="The tags for this video file",
     )
+
+    def get_media_url(self, name):
+        """Return the URL of a file of this video, with the derived files signed per directory.
+
+        The playlists, segments, sprites and thumbnail index in the directory of the
+        derived files refer to each other with relative URLs, which nginx can then
+        serve without asking Django.
+        """
+        if self.is_public and name != self.original.name:
+            return get_signed_directory_url(name)
+        return super().get_media_url(name)
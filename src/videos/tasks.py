@@ -0,0 +1,16 @@
+from .models import Video
+from .transcode import generate_sprites
+from .transcode import transcode
+from jobs.registry import register
+
+
+@register("videos.transcode")
+def transcode_video(uuid):
+    """Transcode a video to HLS renditions and save its poster and metadata."""
+    transcode(Video.objects.get(uuid=uuid))
+
+
+@register("videos.generate_sprites")
+def generate_video_sprites(uuid):
+    """Generate the thumbnail sprite sheets and WebVTT index of a video."""
+    generate_sprites(Video.objects.get(uuid=uuid))
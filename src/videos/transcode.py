@@ -0,0 +1,285 @@
+import json
+import math
+import subprocess
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+
+def probe(path):
+    """Return the duration, width and height of the first video stream in the file."""
+    output = subprocess.run(
+        [
+            settings.FFPROBE_BINARY,
+            "-v",
+            "error",
+            "-select_streams",
+            "v:0",
+            "-show_entries",
+            "stream=width,height:format=duration",
+            "-print_format",
+            "json",
+            path,
+        ],
+        check=True,
+        capture_output=True,
+    ).stdout
+    info = json.loads(output)
+    stream = info["streams"][0]
+    return float(info["format"]["duration"]), stream["width"], stream["height"]
+
+
+def has_audio(path):
+    """Return True if the file has an audio stream."""
+    output = subprocess.run(
+        [
+            settings.FFPROBE_BINARY,
+            "-v",
+            "error",
+            "-select_streams",
+            "a",
+            "-show_entries",
+            "stream=index",
+            "-print_format",
+            "json",
+            path,
+        ],
+        check=True,
+        capture_output=True,
+    ).stdout
+    return bool(json.loads(output).get("streams"))
+
+
+def get_renditions(height):
+    """Return the HLS renditions from settings which are not larger than the video.
+
+    The smallest rendition is always used, so even tiny videos get a stream.
+    """
+    renditions = [
+        r for r in settings.VIDEO_HLS_RENDITIONS if r["height"] <= max(height, 1)
+    ]
+    return renditions or settings.VIDEO_HLS_RENDITIONS[-1:]
+
+
+def get_output_dir(video):
+    """Return the storage path of the directory for the derived files of the video."""
+    return str(Path(video.original.name).with_suffix("")) + "_hls"
+
+
+def transcode(video):
+    """Transcode the original video to adaptive HLS renditions and grab a poster frame.
+
+    All the renditions are made by a single ffmpeg run, which decodes the original
+    once and splits the decoded frames between the H.264 encoders. ffmpeg writes the
+    segments, the playlist of each rendition and the master playlist directly to the
+    directory next to the original, so this needs storage on the local filesystem.
+    """
+    source = video.original.path
+    duration, width, height = probe(source)
+    renditions = get_renditions(height)
+    audio = has_audio(source)
+    output_dir = get_output_dir(video)
+    path = Path(default_storage.path(output_dir))
+    path.mkdir(parents=True, exist_ok=True)
+
+    # a progressive MP4 for browsers which only play HLS with a script, which is all
+    # but Safari, so they do not have to download the original
+    mp4 = settings.VIDEO_MP4_RENDITION
+    filters = [
+        f"[0:v]split={len(renditions) + 1}"
+        + "".join(f"[v{i}]" for i in range(len(renditions)))
+        + "[mp4]",
+        f"[mp4]scale=-2:{min(mp4['height'], height) // 2 * 2}[mp4out]",
+    ]
+    command = [settings.FFMPEG_BINARY, "-y", "-v", "error", "-i", source]
+    stream_map = []
+    for i, rendition in enumerate(renditions):
+        # scale to an even width which keeps the aspect ratio, as H.264 needs
+        filters.append(f"[v{i}]scale=-2:{rendition['height']}[v{i}out]")
+        command += [
+            "-map",
+            f"[v{i}out]",
+            f"-c:v:{i}",
+            "libx264",
+            f"-b:v:{i}",
+            rendition["video_bitrate"],
+            f"-maxrate:v:{i}",
+            rendition["video_bitrate"],
+            f"-bufsize:v:{i}",
+            rendition["video_bitrate"],
+        ]
+        if audio:
+            command += [
+                "-map",
+                "0:a:0",
+                f"-c:a:{i}",
+                "aac",
+                f"-b:a:{i}",
+                rendition["audio_bitrate"],
+            ]
+            stream_map.append(f"v:{i},a:{i},name:{rendition['height']}p")
+        else:
+            stream_map.append(f"v:{i},name:{rendition['height']}p")
+    command += [
+        "-filter_complex",
+        ";".join(filters),
+        "-preset",
+        "veryfast",
+        "-pix_fmt",
+        "yuv420p",
+        # a keyframe every two seconds so all renditions can switch at segment borders
+        "-force_key_frames",
+        "expr:gte(t,n_forced*2)",
+        "-f",
+        "hls",
+        "-hls_time",
+        "6",
+        "-hls_playlist_type",
+        "vod",
+        "-hls_segment_filename",
+        str(path / "%v_%05d.ts"),
+        "-master_pl_name",
+        "master.m3u8",
+        "-var_stream_map",
+        " ".join(stream_map),
+        str(path / "%v.m3u8"),
+    ]
+    # the options after the HLS output apply to the MP4 output
+    command += [
+        "-map",
+        "[mp4out]",
+        "-c:v",
+        "libx264",
+        "-b:v",
+        mp4["video_bitrate"],
+        "-maxrate:v",
+        mp4["video_bitrate"],
+        "-bufsize:v",
+        mp4["video_bitrate"],
+    ]
+    if audio:
+        command += ["-map", "0:a:0", "-c:a", "aac", "-b:a", mp4["audio_bitrate"]]
+    command += [
+        "-preset",
+        "veryfast",
+        "-pix_fmt",
+        "yuv420p",
+        # put the index first, so playback can start before the download finishes
+        "-movflags",
+        "+faststart",
+        str(path / "video.mp4"),
+    ]
+    subprocess.run(command, check=True, capture_output=True)
+
+    # the poster is taken a little into the video, the first frame is often black
+    subprocess.run(
+        [
+            settings.FFMPEG_BINARY,
+            "-y",
+            "-v",
+            "error",
+            "-ss",
+            str(duration / 10),
+            "-i",
+            source,
+            "-frames:v",
+            "1",
+            "-vf",
+            f"scale=-2:{renditions[0]['height']}",
+            "-q:v",
+            "3",
+            str(path / "poster.jpg"),
+        ],
+        check=True,
+        capture_output=True,
+    )
+
+    video.duration = timedelta(seconds=duration)
+    video.width = width
+    video.height = height
+    video.playlist = f"{output_dir}/master.m3u8"
+    video.mp4 = f"{output_dir}/video.mp4"
+    video.poster = f"{output_dir}/poster.jpg"
+    video.filesize = video.original.size
+    video.save(
+        update_fields=[
+            "duration",
+            "width",
+            "height",
+            "playlist",
+            "mp4",
+            "poster",
+            "filesize",
+            "updated",
+        ],
+    )
+
+
+def format_timestamp(seconds):
+    """Return the seconds as a WebVTT timestamp like 01:02:03.000."""
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours:02}:{minutes:02}:{seconds:06.3f}"
+
+
+def generate_sprites(video):
+    """Make thumbnail sprite sheets and a WebVTT index of them for scrubbing previews.
+
+    A frame is sampled every VIDEO_SPRITE_INTERVAL seconds and the frames are tiled
+    into sheets of VIDEO_SPRITE_COLUMNS x VIDEO_SPRITE_ROWS thumbnails, all in one
+    ffmpeg pass. The WebVTT file maps each interval of the video to a region of a
+    sheet with a media fragment, like sprite_001.jpg#xywh=160,0,160,90, so a player
+    can show the preview for any position from a few small images.
+    """
+    source = video.original.path
+    duration, width, height = probe(source)
+    interval = settings.VIDEO_SPRITE_INTERVAL
+    columns = settings.VIDEO_SPRITE_COLUMNS
+    rows = settings.VIDEO_SPRITE_ROWS
+    tile_width = settings.VIDEO_SPRITE_TILE_WIDTH
+    # keep the aspect ratio of the video, rounded to an even height
+    tile_height = max(2, round(tile_width * height / width / 2) * 2)
+    output_dir = get_output_dir(video)
+    path = Path(default_storage.path(output_dir))
+    path.mkdir(parents=True, exist_ok=True)
+
+    subprocess.run(
+        [
+            settings.FFMPEG_BINARY,
+            "-y",
+            "-v",
+            "error",
+            # only decode keyframes, the exact frame does not matter for a preview
+            "-skip_frame",
+            "nokey",
+            "-i",
+            source,
+            "-vf",
+            f"fps=1/{interval},scale={tile_width}:{tile_height},tile={columns}x{rows}",
+            "-vsync",
+            "vfr",
+            "-q:v",
+            "5",
+            str(path / "sprite_%03d.jpg"),
+        ],
+        check=True,
+        capture_output=True,
+    )
+
+    cues = ["WEBVTT", ""]
+    for i in range(math.ceil(duration / interval)):
+        sheet, tile = divmod(i, columns * rows)
+        row, column = divmod(tile, columns)
+        cues += [
+            f"{format_timestamp(i * interval)} --> {format_timestamp(min((i + 1) * interval, duration))}",
+            f"sprite_{sheet + 1:03}.jpg#xywh={column * tile_width},{row * tile_height},{tile_width},{tile_height}",
+            "",
+        ]
+    vtt = f"{output_dir}/thumbnails.vtt"
+    if default_storage.exists(vtt):
+        default_storage.delete(vtt)
+    video.thumbnails = default_storage.save(vtt, ContentFile("\n".join(cues)))
+    video.save(update_fields=["thumbnails", "updated"])